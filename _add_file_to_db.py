@@ -1,94 +1,291 @@
 """
-Скрипт для добавления hash значений в БД(Синхронизация).
-Одноразово.
+Скрипт для добавления hash значений в БД (синхронизация / backfill file_hashes).
+
+Источники:
+  --downloads  локальные файлы из downloads/ — хеш считается в пуле потоков (utils/hashing.py)
+  --html       ссылки на документы из output_data (*.jsonl-манифесты, иначе *.html) — скачиваются
+               параллельно, потоково, файл на диск не пишется; URL из document_urls не качаются вовсе
+
+Хеши пишутся в file_hashes пачками. Уже обработанные файлы/URL записываются в чекпоинт
+(после того как их пачка попала в БД) — повторный запуск продолжает с места остановки.
+
+Запуск:  python _add_file_to_db.py --downloads --html --concurrency 16
 """
+import argparse
 import asyncio
 import hashlib
+import time
 from pathlib import Path
+from typing import Iterator, Optional
 
 import aiohttp
-from bs4 import BeautifulSoup
 
-from db.core.session import async_session
-from db.crud import insert_file_hash, file_hash_exists  # убедись, что эти функции есть
+from db.crud import async_document_urls_known, async_insert_file_hashes_bulk, async_upsert_document_url
+from utils.blob_store import BLOB_DIR
+from utils.funcs import OUTPUT_FOLDER
+from utils.hashing import HASH_WORKERS, run_in_hash_pool, sha256_file
+from utils.manifest import read_manifest, records_from_html
+from utils.pipeline import Pipeline, Stage
+from utils.text_match import KeywordMatcher
+from utils.write_behind import WriteBehindBuffer
 
 
 KEYWORDS = ("пас", "pas")
+KEYWORD_MATCHER = KeywordMatcher(KEYWORDS)
+
+DOWNLOADS_DIR = Path("downloads")
+CHECKPOINT_PATH = Path("LOGS/backfill_hashes.checkpoint")
+
+BATCH_SIZE = 500            # хешей в одной транзакции
+FLUSH_INTERVAL = 5.0        # сек — сбрасывать пачку не реже
+REPORT_INTERVAL = 10.0      # сек — печать прогресса
+READ_CHUNK_SIZE = 256 * 1024
+HTTP_TIMEOUT = aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=60)
 
 
 def match_filename(name: str) -> bool:
-    name_lower = name.lower()
-    return any(k in name_lower for k in KEYWORDS)
+    return KEYWORD_MATCHER.search(name)
+
 
+# ─── Источники ────────────────────────────────────────────────
 
-def extract_links(html: str) -> list[tuple[str, str]]:
+def iter_local_files(root: Path) -> Iterator[Path]:
     """
-    Возвращает [(имя файла, url)]
+    Все скачанные файлы в дереве downloads/, кроме недокачанных .part и их состояния.
+    Само хранилище блобов не обходится — его файлы уже видны через ссылки в папках источников.
     """
-    soup = BeautifulSoup(html, "html.parser")
-    result = []
+    for path in root.rglob("*"):
+        if BLOB_DIR in path.relative_to(root).parts:
+            continue
+        if path.is_file() and not path.name.endswith((".part", ".part.json")):
+            yield path
 
-    for a in soup.find_all("a"):
-        url = a.get("href")
-        name = a.text.strip()
 
-        if not url or not name:
-            continue
+def iter_document_links(output_dir: Path, all_titles: bool = False) -> Iterator[tuple[str, str]]:
+    """
+    (название, url) документов из output_data. Если у отчёта есть манифест (.jsonl) — берётся он,
+    иначе ссылки разбираются из HTML. Без all_titles — только названия с KEYWORDS. Каждый URL — один раз.
+    """
+    seen: set[str] = set()
+    manifests = {p.stem: p for p in output_dir.glob("*.jsonl")}
+    reports = [p for p in output_dir.glob("*.html") if p.stem not in manifests]
+
+    sources = [read_manifest(p) for p in manifests.values()] + [records_from_html(p) for p in reports]
+    for records in sources:
+        for record in records:
+            name, url = (record.get("title") or "").strip(), record.get("url")
+            if not url or not name or url in seen:
+                continue
+            if all_titles or match_filename(name):
+                seen.add(url)
+                yield name, url
 
-        if match_filename(name):
-            result.append((name, url))
 
-    return result
+# ─── Чекпоинт ────────────────────────────────────────────────
 
+class Checkpoint:
+    """
+    Ключи (путь файла или URL), хеши которых уже записаны в БД. Файл только дописывается.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._done: set[str] = set()
+        if path.exists():
+            with path.open(encoding="utf-8") as f:
+                self._done = {line.rstrip("\n") for line in f if line.strip()}
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._done
+
+    def __len__(self) -> int:
+        return len(self._done)
+
+    def mark(self, keys: list[str]):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a", encoding="utf-8") as f:
+            f.writelines(f"{key}\n" for key in keys)
+        self._done.update(keys)
 
-async def download_and_hash(session: aiohttp.ClientSession, url: str) -> tuple[bytes, str]:
+
+class HashBatchWriter(WriteBehindBuffer[tuple[str, str]]):
     """
-    Скачивает файл в память и возвращает (данные, SHA256 хеш)
+    Копит (ключ, хеш) и пишет хеши в file_hashes пачками — каждые batch_size штук или раз в
+    flush_interval сек (utils/write_behind.py). Ключи попадают в чекпоинт только после успешной
+    записи их пачки; незаписанное будет обработано при следующем запуске.
     """
-    async with session.get(url, timeout=aiohttp.ClientTimeout(total=60)) as resp:
+
+    def __init__(self, checkpoint: Checkpoint, batch_size: int = BATCH_SIZE, flush_interval: float = FLUSH_INTERVAL):
+        super().__init__(self._write, "file_hashes", batch_size, flush_interval)
+        self.checkpoint = checkpoint
+        self.inserted = 0
+
+    async def _write(self, batch: list[tuple[str, str]]) -> Optional[int]:
+        inserted = await async_insert_file_hashes_bulk(bytes.fromhex(h) for _, h in batch)
+        if inserted is not None:
+            self.inserted += inserted
+        return inserted
+
+    def _describe(self, item: tuple[str, str]) -> str:
+        return item[0]
+
+    def add(self, key: str, hash_value: str):
+        self._push((key, hash_value))
+
+    async def _on_flushed(self, batch: list[tuple[str, str]]):
+        await asyncio.to_thread(self.checkpoint.mark, [key for key, _ in batch])
+
+
+# ─── Хеширование ────────────────────────────────────────────────
+
+async def download_and_hash(session: aiohttp.ClientSession, url: str) -> tuple[str, int, Optional[str], Optional[str]]:
+    """
+    Потоково скачивает файл и возвращает (SHA256, размер, ETag, Last-Modified).
+    В памяти — не больше одного куска; хеш считается в пуле потоков.
+    """
+    hasher = hashlib.sha256()
+    size = 0
+    async with session.get(url, timeout=HTTP_TIMEOUT) as resp:
         resp.raise_for_status()
-        data = await resp.read()
-        sha256 = hashlib.sha256(data).hexdigest()
-        return data, sha256
+        async for chunk in resp.content.iter_chunked(READ_CHUNK_SIZE):
+            await run_in_hash_pool(hasher.update, chunk)
+            size += len(chunk)
+        return hasher.hexdigest(), size, resp.headers.get("ETag"), resp.headers.get("Last-Modified")
 
 
-async def process_html_file(path: Path, http: aiohttp.ClientSession):
-    print(f"\nОбрабатываю HTML-файл: {path.name}")
+def new_backfill_stats() -> dict:
+    return {
+        "local": 0,
+        "remote": 0,
+        "cached": 0,
+        "skipped": 0,
+        "errors": 0,
+        "bytes": 0,
+    }
 
-    html = path.read_text(encoding="utf-8")
-    links = extract_links(html)
 
-    if not links:
-        print("  Совпадающие ссылки не найдены.")
-        return
+def build_pipeline(http: aiohttp.ClientSession, writer: HashBatchWriter, stats: dict,
+                   known: dict, concurrency: int) -> Pipeline:
 
-    async with async_session() as db:
-        for filename, url in links:
-            try:
-                data, sha256 = await download_and_hash(http, url)
+    async def on_local(path: Path):
+        try:
+            sha256, size = await sha256_file(path)
+        except OSError as e:
+            stats["errors"] += 1
+            print(f"[ОШИБКА] {path} | {e}")
+            return
+        writer.add(path.as_posix(), sha256)
+        stats["local"] += 1
+        stats["bytes"] += size
+
+    async def on_remote(link: tuple[str, str]):
+        filename, url = link
+
+        if url in known:
+            # уже скачивался загрузчиком — хеш есть в document_urls
+            writer.add(url, known[url].hash)
+            stats["cached"] += 1
+            return
+
+        try:
+            sha256, size, etag, last_modified = await download_and_hash(http, url)
+        except Exception as e:
+            stats["errors"] += 1
+            print(f"[ОШИБКА] {filename} | {url} | {e}")
+            return
+
+        await async_upsert_document_url(url, sha256, size, etag, last_modified)
+        writer.add(url, sha256)
+        stats["remote"] += 1
+        stats["bytes"] += size
 
-                exists = await file_hash_exists(db, sha256)
-                if exists:
-                    action = "ПРОПУЩЕНО"
-                    print(f"[{action}] {filename} | {url} | размер={len(data)} байт | хеш={sha256[:12]}")
-                    continue
+    return Pipeline(
+        [
+            Stage("local", on_local, workers=HASH_WORKERS * 2, queue_size=HASH_WORKERS * 8),
+            Stage("remote", on_remote, workers=concurrency, queue_size=concurrency * 4),
+        ],
+        name="backfill",
+        report_interval=REPORT_INTERVAL * 6,  # общий прогресс печатает report_progress
+    )
 
-                inserted = await insert_file_hash(db, sha256)
-                action = "НОВЫЙ" if inserted else "ДУБЛИКАТ"
 
-                print(f"[{action}] {filename} | {url} | размер={len(data)} байт | хеш={sha256[:12]}")
+async def report_progress(stats: dict, started: float):
+    while True:
+        await asyncio.sleep(REPORT_INTERVAL)
+        print_progress(stats, started)
+
+
+def print_progress(stats: dict, started: float):
+    elapsed = max(time.monotonic() - started, 1e-9)
+    done = stats["local"] + stats["remote"] + stats["cached"]
+    print(
+        f"[BACKFILL] файлов: {done} ({done / elapsed:.1f}/с) | "
+        f"локальных {stats['local']} | скачано {stats['remote']} | из кэша URL {stats['cached']} | "
+        f"{stats['bytes'] / 1e6 / elapsed:.1f} МБ/с"
+        + (f" | ошибок {stats['errors']}" if stats["errors"] else "")
+    )
+
+
+# ─── Запуск ────────────────────────────────────────────────
+
+async def backfill(use_downloads: bool, use_html: bool, all_titles: bool, concurrency: int, checkpoint_path: Path):
+    checkpoint = Checkpoint(checkpoint_path)
+    if len(checkpoint):
+        print(f"Чекпоинт {checkpoint_path}: уже обработано {len(checkpoint)} — они будут пропущены")
+
+    links: list[tuple[str, str]] = []
+    if use_html:
+        links = await asyncio.to_thread(lambda: list(iter_document_links(Path(OUTPUT_FOLDER), all_titles)))
+        links = [(name, url) for name, url in links if url not in checkpoint]
+        print(f"Ссылок из {OUTPUT_FOLDER} к обработке: {len(links)}")
+    known = await async_document_urls_known(url for _, url in links)
+
+    stats = new_backfill_stats()
+    started = time.monotonic()
+    reporter = asyncio.create_task(report_progress(stats, started))
+
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=concurrency)) as http:
+        async with HashBatchWriter(checkpoint) as writer:
+            pipeline = build_pipeline(http, writer, stats, known, concurrency)
+            local_stage, remote_stage = pipeline.stages
+            pipeline.start()
+            try:
+                if use_downloads:
+                    for path in iter_local_files(DOWNLOADS_DIR):
+                        if path.as_posix() in checkpoint:
+                            stats["skipped"] += 1
+                            continue
+                        await local_stage.put(path)
+                for link in links:
+                    await remote_stage.put(link)
+            finally:
+                await pipeline.close()
+                reporter.cancel()
+
+    print("\n" + "═" * 60)
+    print_progress(stats, started)
+    print(f"Новых хешей в file_hashes: {writer.inserted}")
+    print(f"Пропущено по чекпоинту (локальные): {stats['skipped']}")
+    print("═" * 60)
 
-            except Exception as e:
-                print(f"[ОШИБКА] {filename} | {url} | {e}")
 
+def main():
+    parser = argparse.ArgumentParser(description="Backfill хешей документов в file_hashes")
+    parser.add_argument("--downloads", action="store_true", help=f"хешировать файлы из {DOWNLOADS_DIR}/")
+    parser.add_argument("--html", action="store_true", help=f"скачать и хешировать документы из {OUTPUT_FOLDER}/")
+    parser.add_argument("--all-titles", action="store_true", help="не фильтровать ссылки по KEYWORDS")
+    parser.add_argument("--concurrency", type=int, default=16, help="одновременных загрузок")
+    parser.add_argument("--checkpoint", type=Path, default=CHECKPOINT_PATH)
+    parser.add_argument("--reset", action="store_true", help="начать заново, удалив чекпоинт")
+    args = parser.parse_args()
 
-async def main():
-    html_files = Path("output_data").glob("*.html")
+    if not (args.downloads or args.html):
+        args.downloads = args.html = True
+    if args.reset:
+        args.checkpoint.unlink(missing_ok=True)
 
-    async with aiohttp.ClientSession() as http:
-        for file_path in html_files:
-            await process_html_file(file_path, http)
+    asyncio.run(backfill(args.downloads, args.html, args.all_titles, args.concurrency, args.checkpoint))
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    main()
@@ -0,0 +1,122 @@
+"""
+Бенчмарк скачивания с хешированием при 8/16/32 одновременных загрузках с локального файлового сервера:
+  inline — SHA-256 и запись куска прямо в event loop (как было до utils/hashing.py)
+  pool   — async_download_file.fetch_to_part: запись + SHA-256 в пуле потоков HASH_WORKERS
+
+Кроме пропускной способности меряется задержка event loop (тикер раз в 5 мс):
+именно она показывает, насколько хеширование мешает остальным загрузкам и запросам.
+
+Запуск:  python _bench_download_hashing.py --files 64 --size-mb 8 --workers 4
+Сервер (aiohttp) работает в отдельном процессе, файлы — во временной папке.
+"""
+import argparse
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import aiohttp
+from aiohttp import web
+
+import async_download_file
+from async_download_file import DOWNLOAD_CHUNK_SIZE, fetch_to_part
+from utils.hashing import set_hash_workers
+
+PORT = 8769
+
+
+def serve(root: str):
+    app = web.Application()
+    app.router.add_static("/", root)
+    web.run_app(app, host="127.0.0.1", port=PORT, print=None)
+
+
+async def fetch_inline(session: aiohttp.ClientSession, url: str, path: Path) -> str:
+    hasher = hashlib.sha256()
+    async with session.get(url) as resp:
+        resp.raise_for_status()
+        with path.open("wb") as f:
+            async for chunk in resp.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                hasher.update(chunk)
+                f.write(chunk)
+    return hasher.hexdigest()
+
+
+async def fetch_pool(session: aiohttp.ClientSession, url: str, path: Path) -> str:
+    sha256, _, _, _ = await fetch_to_part(session, url, path)
+    return sha256
+
+
+async def loop_lag(samples: list, stop: asyncio.Event, interval: float = 0.005):
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append((time.perf_counter() - t0 - interval) * 1000)
+
+
+async def run(mode: str, files: int, concurrency: int, out_dir: Path, expected: dict) -> tuple[float, float, float]:
+    fetch = fetch_inline if mode == "inline" else fetch_pool
+    sem = asyncio.Semaphore(concurrency)
+    lag: list[float] = []
+    stop = asyncio.Event()
+
+    async def one(i: int):
+        async with sem:
+            sha = await fetch(session, f"http://127.0.0.1:{PORT}/f{i}.bin", out_dir / f"{mode}{i}.part")
+            assert sha == expected[i]
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        ticker = asyncio.create_task(loop_lag(lag, stop))
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(files)))
+        elapsed = time.perf_counter() - t0
+        stop.set()
+        await ticker
+
+    p99 = statistics.quantiles(lag, n=100)[-1] if len(lag) > 1 else 0.0
+    return elapsed, p99, max(lag, default=0.0)
+
+
+async def main(files: int, size_mb: int, workers: int):
+    async_download_file.RESUMABLE_DOWNLOADS = False
+    set_hash_workers(workers)
+
+    with tempfile.TemporaryDirectory() as root, tempfile.TemporaryDirectory() as out:
+        expected = {}
+        for i in range(files):
+            data = os.urandom(size_mb * 1024 * 1024)
+            Path(root, f"f{i}.bin").write_bytes(data)
+            expected[i] = hashlib.sha256(data).hexdigest()
+
+        server = multiprocessing.Process(target=serve, args=(root,), daemon=True)
+        server.start()
+        await asyncio.sleep(1.5)
+
+        total_mb = files * size_mb
+        print(f"файлов: {files} × {size_mb} МБ, HASH_WORKERS={workers}, CPU: {os.cpu_count()}\n")
+        print(f"{'загрузок':>8} | {'режим':<6} | {'МБ/с':>7} | {'лаг loop p99, мс':>16} | {'лаг max, мс':>11}")
+        print("-" * 62)
+        try:
+            for concurrency in (8, 16, 32):
+                for mode in ("inline", "pool"):
+                    elapsed, p99, lag_max = await run(mode, files, concurrency, Path(out), expected)
+                    print(f"{concurrency:>8} | {mode:<6} | {total_mb / elapsed:>7.0f} | {p99:>16.2f} | {lag_max:>11.2f}")
+                    for p in Path(out).iterdir():
+                        p.unlink()
+        finally:
+            server.terminate()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=64)
+    parser.add_argument("--size-mb", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.files, args.size_mb, args.workers))
@@ -0,0 +1,125 @@
+"""
+Бенчмарк хранения SHA-256 в file_hashes (SQLite):
+  hex  — старая схема: hash VARCHAR(64), 64-символьная hex-строка
+  bin  — новая схема: hash BLOB (LargeBinary(32)) + created_at
+
+Для каждого размера таблицы (по умолчанию 1 млн и 10 млн хешей) меряется:
+  размер файла БД (и индекса ix_file_hashes_hash, если SQLite собран с dbstat),
+  exists — SELECT id ... WHERE hash = ? LIMIT 1 (половина найдётся, половина нет), мкс на запрос,
+  insert — вставка новых хешей по одному в открытой транзакции (работа с индексом), мкс на строку.
+
+Запуск:  python _bench_hash_storage.py --sizes 1000000,10000000
+Базы создаются во временной папке и удаляются после замера.
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+BUILD_BATCH = 100_000
+LOOKUPS = 20_000
+INSERTS = 20_000
+
+SCHEMAS = {
+    "hex": (
+        "CREATE TABLE file_hashes (id INTEGER NOT NULL, hash VARCHAR(64) NOT NULL, PRIMARY KEY (id))",
+        lambda digest: digest.hex(),
+    ),
+    "bin": (
+        "CREATE TABLE file_hashes (id INTEGER NOT NULL, hash BLOB NOT NULL, "
+        "created_at DATETIME DEFAULT (CURRENT_TIMESTAMP) NOT NULL, PRIMARY KEY (id))",
+        lambda digest: digest,
+    ),
+}
+INDEX_DDL = "CREATE UNIQUE INDEX ix_file_hashes_hash ON file_hashes (hash)"
+
+
+def build(path: Path, layout: str, size: int, seed: int) -> tuple[list[bytes], float]:
+    """
+    Заливает size случайных хешей; индекс существует с самого начала, как в рабочей базе.
+    Возвращает выборку вставленных digest (для exists) и время заливки.
+    """
+    ddl, encode = SCHEMAS[layout]
+    rnd = random.Random(seed)
+    sample: list[bytes] = []
+
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute(ddl)
+    conn.execute(INDEX_DDL)
+
+    t0 = time.perf_counter()
+    for start in range(0, size, BUILD_BATCH):
+        batch = [rnd.randbytes(32) for _ in range(min(BUILD_BATCH, size - start))]
+        sample.extend(batch[:: max(1, size // LOOKUPS)])
+        with conn:
+            conn.executemany("INSERT INTO file_hashes (hash) VALUES (?)", ((encode(d),) for d in batch))
+    elapsed = time.perf_counter() - t0
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+    return sample[:LOOKUPS // 2], elapsed
+
+
+def index_size(conn: sqlite3.Connection) -> int | None:
+    try:
+        row = conn.execute("SELECT SUM(pgsize) FROM dbstat WHERE name = 'ix_file_hashes_hash'").fetchone()
+        return row[0]
+    except sqlite3.OperationalError:
+        return None
+
+
+def measure(path: Path, layout: str, present: list[bytes], seed: int) -> dict:
+    _, encode = SCHEMAS[layout]
+    rnd = random.Random(seed + 1)
+    conn = sqlite3.connect(path)
+
+    result = {"db_size": path.stat().st_size, "index_size": index_size(conn)}
+
+    probes = [encode(d) for d in present] + [encode(rnd.randbytes(32)) for _ in range(LOOKUPS - len(present))]
+    rnd.shuffle(probes)
+    stmt = "SELECT id FROM file_hashes WHERE hash = ? LIMIT 1"
+    found = 0
+    t0 = time.perf_counter()
+    for value in probes:
+        found += conn.execute(stmt, (value,)).fetchone() is not None
+    result["exists_us"] = (time.perf_counter() - t0) / len(probes) * 1e6
+    assert found == len(present)
+
+    new = [encode(rnd.randbytes(32)) for _ in range(INSERTS)]
+    t0 = time.perf_counter()
+    with conn:
+        for value in new:
+            conn.execute("INSERT OR IGNORE INTO file_hashes (hash) VALUES (?)", (value,))
+    result["insert_us"] = (time.perf_counter() - t0) / INSERTS * 1e6
+
+    conn.close()
+    return result
+
+
+def bench(sizes: list[int], seed: int):
+    print(f"SQLite {sqlite3.sqlite_version}, exists: {LOOKUPS} запросов, insert: {INSERTS} строк\n")
+    print(f"{'хешей':>11} | {'схема':<5} | {'заливка, с':>10} | {'БД, МБ':>8} | {'индекс, МБ':>10} | "
+          f"{'exists, мкс':>11} | {'insert, мкс':>11}")
+    print("-" * 86)
+    for size in sizes:
+        for layout in SCHEMAS:
+            with tempfile.TemporaryDirectory() as tmp:
+                path = Path(tmp) / f"{layout}.sqlite"
+                present, build_time = build(path, layout, size, seed)
+                r = measure(path, layout, present, seed)
+                index_mb = f"{r['index_size'] / 1e6:.1f}" if r["index_size"] is not None else "—"
+                print(f"{size:>11,} | {layout:<5} | {build_time:>10.1f} | {r['db_size'] / 1e6:>8.1f} | "
+                      f"{index_mb:>10} | {r['exists_us']:>11.2f} | {r['insert_us']:>11.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="1000000,10000000", help="размеры таблицы через запятую")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    bench([int(s) for s in args.sizes.split(",")], args.seed)
@@ -0,0 +1,83 @@
+"""
+Бенчмарк извлечения ссылок из HTML-отчёта output_data:
+  bs4     — старый путь: read_text() + BeautifulSoup(..., "html.parser").find_all("a")
+  stream  — utils/html_links.iter_links (потоковый html.parser, без дерева)
+
+Запуск:  python _bench_html_links.py --tenders 10000
+Отчёт генерируется во временную папку теми же функциями, что пишут output_data (utils/funcs.py).
+"""
+import argparse
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+from utils.funcs import render_html_header, render_tender_block
+from utils.html_links import iter_links
+
+
+def make_report(path: Path, tenders: int):
+    with path.open("w", encoding="utf-8") as f:
+        f.write(render_html_header("Бенчмарк"))
+        for i in range(tenders):
+            files = [
+                (f"Паспорт_{i}_{j} & копія <скан>.pdf", f"https://public-docs.prozorro.gov.ua/get/{i:08x}{j:04x}")
+                for j in range(i % 7 + 1)
+            ]
+            f.write(render_tender_block(f"UA-2025-01-01-{i:06d}-a", files))
+
+
+def links_bs4(path: Path) -> int:
+    soup = BeautifulSoup(path.read_text(encoding="utf-8", errors="replace"), "html.parser")
+    return len([(a.text, a.get("href")) for a in soup.find_all("a")])
+
+
+def links_stream(path: Path) -> int:
+    # как в загрузчике: ссылки потребляются по одной, список не копится
+    return sum(1 for _ in iter_links(path))
+
+
+def _run(func_name: str, path: Path) -> tuple[int, float, int]:
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    t0 = time.perf_counter()
+    count = globals()[func_name](path)
+    elapsed = time.perf_counter() - t0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base  # КБ (Linux)
+    return count, elapsed, peak
+
+
+def measure(func_name: str, path: Path) -> tuple[int, float, int]:
+    """
+    Каждый способ — в отдельном свежем процессе, чтобы прирост пикового RSS был честным.
+    """
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        return pool.submit(_run, func_name, path).result()
+
+
+def bench(tenders: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "report.html"
+        make_report(path, tenders)
+        size_mb = path.stat().st_size / 1e6
+        print(f"тендеров: {tenders}, размер HTML: {size_mb:.1f} МБ\n")
+
+        expected, t_bs4, m_bs4 = measure("links_bs4", path)
+        count, t_stream, m_stream = measure("links_stream", path)
+        assert count == expected
+
+        print(f"{'способ':<7} | {'время, с':>8} | {'МБ/с':>6} | {'прирост RSS, МБ':>16}")
+        print("-" * 47)
+        for label, t, m in (("bs4", t_bs4, m_bs4), ("stream", t_stream, m_stream)):
+            print(f"{label:<7} | {t:>8.2f} | {size_mb / t:>6.1f} | {m / 1024:>16.1f}")
+        print(f"\nссылок: {count} (столько же, сколько у bs4)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tenders", type=int, default=10_000)
+    args = parser.parse_args()
+
+    bench(args.tenders)
@@ -0,0 +1,146 @@
+"""
+Бенчмарк задержки HTTP-запросов к локальному mock-серверу:
+  per-request — новый клиент (TCP+TLS) на каждый запрос, как было с httpx.get/httpx.post
+  pooled      — общий клиент с keep-alive (clients/http_pool.py), HTTP/1.1
+  http2       — общий клиент с HTTP/2 (мультиплексирование в одном соединении)
+
+Нужны пакеты для бенчмарка:  pip install hypercorn "httpx[http2]"
+TLS-сертификат генерируется через openssl во временную папку.
+
+Запуск:  python _bench_http_pool.py --requests 500 --concurrency 10 --delay-ms 20
+"""
+import argparse
+import asyncio
+import json
+import ssl
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import httpx
+
+from clients.http_pool import HttpPool, http2_available
+
+PORT = 8443
+
+
+async def mock_app(scope, receive, send):
+    """Отвечает JSON-ом, как /api/tenders/{id}/details, с искусственной задержкой."""
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    await asyncio.sleep(mock_app.delay)
+    body = json.dumps({"tenderID": scope["path"].rsplit("/", 2)[-2], "bids": []}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+mock_app.delay = 0.0
+
+
+def make_cert(tmp: Path) -> tuple[Path, Path]:
+    cert, key = tmp / "cert.pem", tmp / "key.pem"
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-keyout", str(key), "-out", str(cert), "-subj", "/CN=localhost",
+         "-addext", "subjectAltName=DNS:localhost,IP:127.0.0.1"],
+        check=True, capture_output=True,
+    )
+    return cert, key
+
+
+def start_server(cert: Path, key: Path) -> threading.Event:
+    from hypercorn.asyncio import serve
+    from hypercorn.config import Config
+
+    config = Config()
+    config.bind = [f"127.0.0.1:{PORT}"]
+    config.certfile = str(cert)
+    config.keyfile = str(key)
+    config.alpn_protocols = ["h2", "http/1.1"]
+    config.loglevel = "ERROR"
+
+    stop = threading.Event()
+
+    async def run():
+        await serve(mock_app, config, shutdown_trigger=lambda: asyncio.to_thread(stop.wait))
+
+    threading.Thread(target=lambda: asyncio.run(run()), daemon=True).start()
+    time.sleep(1.5)
+    return stop
+
+
+async def run_mode(mode: str, n: int, concurrency: int, ssl_ctx: ssl.SSLContext) -> list[float]:
+    pool = HttpPool()
+    url = f"https://127.0.0.1:{PORT}/api/tenders/UA-2025-01-01-%06d-a/details"
+    shared = None
+    if mode != "per-request":
+        shared = httpx.AsyncClient(verify=ssl_ctx, limits=pool.limits, http2=(mode == "http2"))
+
+    sem = asyncio.Semaphore(concurrency)
+    timings: list[float] = []
+
+    async def one(i: int):
+        async with sem:
+            t0 = time.perf_counter()
+            if shared is None:
+                async with httpx.AsyncClient(verify=ssl_ctx) as client:
+                    r = await client.get(url % i)
+            else:
+                r = await shared.get(url % i)
+            r.raise_for_status()
+            timings.append((time.perf_counter() - t0) * 1000)
+
+    await asyncio.gather(*(one(i) for i in range(n)))
+    if shared is not None:
+        await shared.aclose()
+    return timings
+
+
+async def main(n: int, concurrency: int):
+    modes = ["per-request", "pooled"]
+    if http2_available():
+        modes.append("http2")
+    else:
+        print("⚠️  h2 не установлен — режим http2 пропущен")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cert, key = make_cert(Path(tmp))
+        stop = start_server(cert, key)
+        ssl_ctx = ssl.create_default_context(cafile=str(cert))
+
+        print(f"requests={n}, concurrency={concurrency}, задержка сервера={mock_app.delay * 1000:.0f} мс\n")
+        print(f"{'режим':<12} | {'всего, с':>8} | {'rps':>7} | {'p50, мс':>8} | {'p95, мс':>8}")
+        print("-" * 56)
+        for mode in modes:
+            t0 = time.perf_counter()
+            timings = await run_mode(mode, n, concurrency, ssl_ctx)
+            elapsed = time.perf_counter() - t0
+            p95 = statistics.quantiles(timings, n=20)[-1]
+            print(f"{mode:<12} | {elapsed:>8.2f} | {n / elapsed:>7.0f} | {statistics.median(timings):>8.2f} | {p95:>8.2f}")
+
+        stop.set()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--delay-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    mock_app.delay = args.delay_ms / 1000
+    asyncio.run(main(args.requests, args.concurrency))
@@ -0,0 +1,88 @@
+"""
+Бенчмарк профилей SQLite (db/core/engine.py: SQLITE_PROFILES).
+Для каждого профиля на чистой временной БД меряет:
+  - insert: async_insert_tender_to_db из N конкурентных задач (commit на каждый тендер)
+  - bulk:   async_insert_tenders_bulk пачками по 200
+  - exists: async_tender_exists из N конкурентных задач
+  - hash:   insert_file_hash (commit на каждый файл)
+
+Запуск:  python _bench_sqlite_profiles.py --ops 2000 --concurrency 10
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from db.core.base import Base
+from db.core.engine import SQLITE_PROFILES, make_engine, make_async_engine
+from db.core.session import AsyncSessionLocal
+from db.crud import (
+    async_insert_tender_to_db,
+    async_insert_tenders_bulk,
+    async_tender_exists,
+    insert_file_hash,
+)
+
+
+async def run_concurrent(func, items: list, concurrency: int) -> float:
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(item):
+        async with sem:
+            await func(item)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in items))
+    return len(items) / (time.perf_counter() - t0)
+
+
+async def bench_profile(profile: str, ops: int, concurrency: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "bench.sqlite"
+
+        sync_engine = make_engine(f"sqlite:///{db_path}", profile)
+        Base.metadata.create_all(sync_engine)
+        sync_engine.dispose()
+
+        engine = make_async_engine(f"sqlite+aiosqlite:///{db_path}", profile)
+        AsyncSessionLocal.configure(bind=engine)
+
+        ids = [f"UA-2025-01-01-{n:06d}-a" for n in range(ops)]
+        result = {"insert": await run_concurrent(async_insert_tender_to_db, ids, concurrency)}
+
+        bulk_ids = [f"UA-2025-02-01-{n:06d}-b" for n in range(ops * 10)]
+        t0 = time.perf_counter()
+        for i in range(0, len(bulk_ids), 200):
+            await async_insert_tenders_bulk(bulk_ids[i:i + 200])
+        result["bulk"] = len(bulk_ids) / (time.perf_counter() - t0)
+
+        result["exists"] = await run_concurrent(async_tender_exists, ids, concurrency)
+
+        async def one_hash(n: int):
+            async with AsyncSessionLocal() as session:
+                await insert_file_hash(session, n.to_bytes(32, "big"))
+
+        result["hash"] = await run_concurrent(one_hash, list(range(ops)), concurrency)
+
+        await engine.dispose()
+        return result
+
+
+async def main(ops: int, concurrency: int, profiles: list[str]):
+    print(f"ops={ops}, concurrency={concurrency}\n")
+    print(f"{'профиль':<10} | {'insert/с':>10} | {'bulk/с':>10} | {'exists/с':>10} | {'hash/с':>10}")
+    print("-" * 62)
+    for profile in profiles:
+        r = await bench_profile(profile, ops, concurrency)
+        print(f"{profile:<10} | {r['insert']:>10.0f} | {r['bulk']:>10.0f} | {r['exists']:>10.0f} | {r['hash']:>10.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ops", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--profiles", nargs="*", default=list(SQLITE_PROFILES))
+    args = parser.parse_args()
+
+    asyncio.run(main(args.ops, args.concurrency, args.profiles))
@@ -0,0 +1,89 @@
+"""
+Бенчмарк дедупликации страницы поиска (100 tender_id) по таблице tenders.
+Сравнивает старый путь (async_tender_exists на каждый ID) и async_tenders_existing (один SELECT ... IN).
+
+Запуск:  python _bench_tender_dedup.py --rows 1000000 --pages 50
+БД создаётся во временной папке, рабочая db/data/db.sqlite не трогается.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from db.core.base import Base
+from db.core.session import AsyncSessionLocal
+from db.crud import async_tender_exists, async_tenders_existing
+from db.models.file_hash import Tender
+
+
+def make_tender_id(n: int) -> str:
+    return f"UA-2025-{n % 12 + 1:02d}-{n % 28 + 1:02d}-{n:06d}-a"
+
+
+def fill_db(db_path: Path, rows: int, batch: int = 50_000):
+    engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for start in range(0, rows, batch):
+            conn.execute(
+                insert(Tender),
+                [{"tender_id": make_tender_id(n)} for n in range(start, min(start + batch, rows))],
+            )
+    engine.dispose()
+
+
+def make_page(rows: int, size: int = 100) -> list[str]:
+    # половина ID уже в базе, половина новые — типичная страница при повторном обходе
+    # без повторов: иначе на странице меньше уникальных известных ID, чем size // 2
+    known = [make_tender_id(i) for i in random.sample(range(rows), size // 2)]
+    new = [make_tender_id(i) for i in random.sample(range(rows, 2 * rows), size - len(known))]
+    page = known + new
+    random.shuffle(page)
+    return page
+
+
+async def per_id(page: list[str]) -> set[str]:
+    return {t for t in page if await async_tender_exists(t)}
+
+
+async def bench(rows: int, pages: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "bench.sqlite"
+
+        t0 = time.perf_counter()
+        fill_db(db_path, rows)
+        print(f"Таблица tenders: {rows:,} строк, заполнено за {time.perf_counter() - t0:.1f} сек")
+
+        engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+        AsyncSessionLocal.configure(bind=engine)
+
+        test_pages = [make_page(rows) for _ in range(pages)]
+
+        for label, func in (("по одному ID", per_id), ("SELECT ... IN", async_tenders_existing)):
+            timings = []
+            for page in test_pages:
+                t0 = time.perf_counter()
+                found = await func(page)
+                timings.append((time.perf_counter() - t0) * 1000)
+                assert len(found) == len(page) // 2
+            print(
+                f"{label:<14} | среднее {statistics.mean(timings):8.2f} мс/стр "
+                f"| медиана {statistics.median(timings):8.2f} мс/стр"
+            )
+
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--pages", type=int, default=50)
+    args = parser.parse_args()
+
+    asyncio.run(bench(args.rows, args.pages))
@@ -1,56 +1,38 @@
-import os
-import httpx
-from dotenv import load_dotenv
+"""
+Проверка прокси из .env — режим health-check пула clients/proxy_pool.py.
+Все прокси проверяются параллельно.
+"""
+import asyncio
 
-load_dotenv()
+from clients.proxy_pool import ProxyPool, load_proxies, PROBE_TIMEOUT
 
-TEST_URL = "https://api.ipify.org?format=json"
-TIMEOUT = 10
 
-
-def load_proxies():
-    proxies = os.getenv("PROXIES", "")
-    return [p.strip() for p in proxies.split(",") if p.strip()]
-
-
-def check_proxy(proxy: str) -> bool:
-    try:
-        with httpx.Client(proxy=proxy, timeout=TIMEOUT) as client:
-            r = client.get(TEST_URL)
-        if r.status_code == 200:
-            print(f"[OK] {proxy} → {r.json()}")
-            return True
-    except Exception as e:
-        print(f"[FAIL] {proxy} → {e}")
-    return False
-
-
-def main():
+async def main():
     proxies = load_proxies()
 
     if not proxies:
         print("Прокси не найдены в .env")
         return
 
-    working = []
-    failed = []
+    pool = ProxyPool(proxies)
+    print(f"Проверка {len(proxies)} прокси (таймаут {PROBE_TIMEOUT} сек)...")
+    report = await pool.check_all()
+
+    working = [p for p, ip in report.items() if ip is not None]
+    failed = [p for p, ip in report.items() if ip is None]
 
-    for proxy in proxies:
-        print(f"\nПроверка: {proxy}")
-        if check_proxy(proxy):
-            working.append(proxy)
-        else:
-            failed.append(proxy)
+    for proxy in working:
+        print(f"[OK] {proxy} → {report[proxy]} | {pool.health[proxy].latency * 1000:.0f} мс")
 
     print("\n" + "=" * 50)
     print(f"Рабочие: {len(working)}")
     print(f"Нерабочие: {len(failed)}")
 
     if working:
-        print("\nWORKING PROXIES:")
-        for p in working:
+        print("\nWORKING PROXIES (от быстрых к медленным):")
+        for p in sorted(working, key=lambda p: pool.health[p].latency):
             print(p)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    asyncio.run(main())
@@ -0,0 +1,84 @@
+"""
+Перевод уже скачанного дерева downloads/ в content-addressed хранилище (utils/blob_store.py).
+
+Каждый файл хешируется (пул потоков utils/hashing.py); первый экземпляр содержимого
+становится блобом downloads/.blobs/ab/cd/<sha256>, а все файлы в папках источников —
+ссылками на него (жёсткими по умолчанию). Имена и расположение файлов в папках
+источников не меняются, дубликаты перестают занимать место.
+
+Повторный запуск безопасен: уже переведённые файлы просто совпадут со своим блобом.
+
+Запуск:  python _migrate_downloads_to_blobs.py [--dry-run] [--symlink]
+"""
+import argparse
+import asyncio
+import time
+from pathlib import Path
+
+from utils.blob_store import BLOB_DIR, BLOB_ROOT, adopt_file, blob_path
+from utils.hashing import HASH_WORKERS, sha256_file
+
+DOWNLOADS_DIR = Path("downloads")
+
+
+def iter_source_files(root: Path):
+    for path in root.rglob("*"):
+        if BLOB_DIR in path.relative_to(root).parts or path.is_symlink():
+            continue
+        if path.is_file() and not path.name.endswith((".part", ".part.json")):
+            yield path
+
+
+async def migrate(dry_run: bool, mode: str):
+    stats = {"files": 0, "new": 0, "linked": 0, "already": 0, "errors": 0, "bytes": 0, "freed": 0}
+    seen: set[str] = set()  # хеши, для которых блоб уже есть/будет (нужно для --dry-run)
+    sem = asyncio.Semaphore(HASH_WORKERS * 2)
+    started = time.monotonic()
+
+    async def one(path: Path):
+        async with sem:
+            try:
+                sha256, size = await sha256_file(path)
+                stats["files"] += 1
+                stats["bytes"] += size
+
+                if dry_run:
+                    status = "linked" if sha256 in seen or blob_path(sha256).exists() else "new"
+                else:
+                    status = await asyncio.to_thread(adopt_file, path, sha256, BLOB_ROOT, mode)
+                seen.add(sha256)
+
+                stats[status] += 1
+                if status == "linked":
+                    stats["freed"] += size
+            except OSError as e:
+                stats["errors"] += 1
+                print(f"[ОШИБКА] {path} | {e}")
+                return
+
+            if stats["files"] % 1000 == 0:
+                elapsed = time.monotonic() - started
+                print(f"[BLOBS] файлов: {stats['files']} ({stats['files'] / elapsed:.1f}/с)")
+
+    files = await asyncio.to_thread(lambda: list(iter_source_files(DOWNLOADS_DIR)))
+    print(f"Файлов в {DOWNLOADS_DIR}: {len(files)}" + (" (dry-run: ничего не меняется)" if dry_run else ""))
+    await asyncio.gather(*(one(path) for path in files))
+
+    elapsed = max(time.monotonic() - started, 1e-9)
+    print("\n" + "═" * 60)
+    print(f"Файлов обработано:        {stats['files']} ({stats['files'] / elapsed:.1f}/с)")
+    print(f"Новых блобов:             {stats['new']}")
+    print(f"Заменено ссылками:        {stats['linked']}")
+    print(f"Уже были в хранилище:     {stats['already']}")
+    print(f"Освобождено места:        {stats['freed'] / 1e6:.1f} МБ из {stats['bytes'] / 1e6:.1f} МБ")
+    print(f"Ошибок:                   {stats['errors']}")
+    print("═" * 60)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Перевод downloads/ в хранилище блобов")
+    parser.add_argument("--dry-run", action="store_true", help="только посчитать, ничего не менять")
+    parser.add_argument("--symlink", action="store_true", help="символические ссылки вместо жёстких")
+    args = parser.parse_args()
+
+    asyncio.run(migrate(args.dry_run, "symlink" if args.symlink else "hardlink"))
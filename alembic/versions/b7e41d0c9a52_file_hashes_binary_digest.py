@@ -0,0 +1,108 @@
+"""file_hashes: store SHA-256 as 32-byte digest, add created_at
+
+Revision ID: b7e41d0c9a52
+Revises: 3f9c2a71d4e8
+Create Date: 2026-10-18 14:02:17.538104
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e41d0c9a52'
+down_revision: Union[str, Sequence[str], None] = '3f9c2a71d4e8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# строк за один проход конвертации — память не зависит от размера таблицы
+BATCH_SIZE = 50_000
+
+
+def _copy_in_batches(source: str, target: str, convert) -> int:
+    """
+    Переливает (id, hash) из source в target пачками по id (keyset), конвертируя hash.
+    Битые значения (не 64 hex-символа / не 32 байта) пропускаются.
+    """
+    conn = op.get_bind()
+    target_table = sa.table(target, sa.column('id'), sa.column('hash'))
+    select_batch = sa.text(f"SELECT id, hash FROM {source} WHERE id > :last ORDER BY id LIMIT :limit")
+
+    last_id, copied, skipped = 0, 0, 0
+    while True:
+        rows = conn.execute(select_batch, {"last": last_id, "limit": BATCH_SIZE}).fetchall()
+        if not rows:
+            break
+        values = []
+        for row_id, value in rows:
+            try:
+                values.append({"id": row_id, "hash": convert(value)})
+            except (ValueError, TypeError, AttributeError):
+                skipped += 1
+        if values:
+            conn.execute(sa.insert(target_table), values)
+        copied += len(values)
+        last_id = rows[-1][0]
+        print(f"  {source} → {target}: {copied:,} строк")
+
+    if skipped:
+        print(f"  пропущено некорректных хешей: {skipped}")
+    return copied
+
+
+def _sync_id_sequence(table: str):
+    """
+    Postgres: id копировались явно — сдвигаем sequence, иначе новые вставки упрутся в старые id.
+    """
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(MAX(id), 1)) FROM {table}")
+
+
+def _hex_to_digest(value: str) -> bytes:
+    digest = bytes.fromhex(value)
+    if len(digest) != 32:
+        raise ValueError(value)
+    return digest
+
+
+def _digest_to_hex(value: bytes) -> str:
+    if len(value) != 32:
+        raise ValueError(value)
+    return bytes(value).hex()
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('file_hashes_new',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('hash', sa.LargeBinary(length=32), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    _copy_in_batches('file_hashes', 'file_hashes_new', _hex_to_digest)
+
+    op.drop_index(op.f('ix_file_hashes_hash'), table_name='file_hashes')
+    op.drop_table('file_hashes')
+    op.rename_table('file_hashes_new', 'file_hashes')
+    # индекс строится один раз по уже залитым данным — быстрее, чем поддерживать его при вставке
+    op.create_index(op.f('ix_file_hashes_hash'), 'file_hashes', ['hash'], unique=True)
+    _sync_id_sequence('file_hashes')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_table('file_hashes_old',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('hash', sa.String(length=64), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    _copy_in_batches('file_hashes', 'file_hashes_old', _digest_to_hex)
+
+    op.drop_index(op.f('ix_file_hashes_hash'), table_name='file_hashes')
+    op.drop_table('file_hashes')
+    op.rename_table('file_hashes_old', 'file_hashes')
+    op.create_index(op.f('ix_file_hashes_hash'), 'file_hashes', ['hash'], unique=True)
+    _sync_id_sequence('file_hashes')
@@ -5,18 +5,26 @@ import httpx
 import time
 import random
 from functools import wraps
-from typing import Optional, Dict, List, Tuple
+from typing import Optional, Dict, List
 from urllib.parse import urlparse, parse_qs
 
 from clients.data import cookies_list
+from clients.http_pool import http_pool, with_cookies
+from utils.rate_limit import host_limiter, limiter_for, format_rate_metrics
 from sources import SOURCES
 from utils.funcs import save_files_as_html
-from db.crud import sync_tender_exists, sync_insert_tender_to_db
+from utils.manifest import append_manifest, manifest_record, seed_manifest_from_html
+from utils.search_ranges import RESULTS_CAP, plan_slices_sync
+from utils.work_journal import WorkJournal, params_key
+from db.crud import sync_tenders_existing, sync_insert_tender_to_db
 from async_download_file import start_download
 from wakepy import keep
 from notifications.telegram import send_notification
 import asyncio
 
+# журнал LOGS/journal/{idx}.jsonl: прерванный проход продолжается с места остановки
+USE_WORK_JOURNAL = True
+
 
 def retry_on_none_or_429(max_attempts=100, delay=1.0):
     def decorator(func):
@@ -60,6 +68,24 @@ def retry_on_none_or_429(max_attempts=100, delay=1.0):
     return decorator
 
 
+def api_request(endpoint: str, method: str, url: str, **kwargs) -> httpx.Response:
+    """
+    Запрос через общий пул и адаптивный лимитер под потолком на хост (см. utils/rate_limit.py).
+    cookies= уходят заголовком Cookie (with_cookies), а не в общий клиент.
+    """
+    kwargs["headers"] = with_cookies(kwargs.get("headers"), kwargs.pop("cookies", None))
+    client = http_pool.get_sync()
+    limiter = limiter_for(None, endpoint)
+    limiter.acquire_blocking()
+    host_limiter(url, endpoint).acquire_blocking()
+    r = client.request(method, url, **kwargs)
+    if r.status_code == 429:
+        limiter.on_throttle()
+    elif r.is_success:
+        limiter.on_success()
+    return r
+
+
 def get_random_cookies() -> Dict[str, str]:
     if not cookies_list:
         return {}
@@ -123,7 +149,7 @@ def fetch_tender_detail(tender_id: str, cookies: Optional[Dict] = None) -> Optio
         "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36",
     }
     try:
-        r = httpx.get(url, headers=headers, cookies=cookies, timeout=12)
+        r = api_request("details", "GET", url, headers=headers, cookies=cookies, timeout=12)
         r.raise_for_status()
         data = r.json()
         return data if data else None
@@ -143,7 +169,7 @@ def fetch_tender_lots(tender_id: str, cookies: Optional[Dict] = None) -> Optiona
         "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
     }
     try:
-        r = httpx.get(url, headers=headers, cookies=cookies, timeout=10)
+        r = api_request("lots", "GET", url, headers=headers, cookies=cookies, timeout=10)
         r.raise_for_status()
         return r.json()
     except Exception as e:
@@ -166,7 +192,7 @@ def fetch_search_page(params: dict, cookies: Optional[Dict] = None) -> Optional[
     }
 
     try:
-        r = httpx.post(url, headers=headers, params=params, cookies=cookies, timeout=15)
+        r = api_request("search", "POST", url, headers=headers, params=params, cookies=cookies, timeout=15)
 
         # print(r.url)
 
@@ -186,7 +212,7 @@ def extract_tender_ids_from_search(response: dict) -> List[str]:
     return [item["tenderID"] for item in data if "tenderID" in item]
 
 
-def parse_bids_documents(bids: list) -> List[Tuple[str, str]]:
+def parse_bids_documents(bids: list) -> List[dict]:
     if not bids:
         return []
     result = []
@@ -195,7 +221,7 @@ def parse_bids_documents(bids: list) -> List[Tuple[str, str]]:
         docs = bid.get("publicDocuments", {})
         if not docs or not isinstance(docs, dict):
             continue
-        for group_docs in docs.values():
+        for group, group_docs in docs.items():
             if not isinstance(group_docs, list):
                 continue
             for doc in group_docs:
@@ -205,12 +231,11 @@ def parse_bids_documents(bids: list) -> List[Tuple[str, str]]:
                 if not url or url in seen:
                     continue
                 seen.add(url)
-                title = doc.get("title", "Без назви").strip()
-                result.append((title, url))
+                result.append(manifest_record(doc, group, bid_id=bid.get("id")))
     return result
 
 
-def parse_lots_documents(lots_data: dict) -> List[Tuple[str, str]]:
+def parse_lots_documents(lots_data: dict) -> List[dict]:
     lots = lots_data.get("lots", [])
     if not lots:
         return []
@@ -219,19 +244,18 @@ def parse_lots_documents(lots_data: dict) -> List[Tuple[str, str]]:
     for lot in lots:
         for bid in lot.get("bids", []):
             docs = bid.get("publicDocuments", {})
-            for group_docs in docs.values():
+            for group, group_docs in docs.items():
                 for doc in group_docs:
                     if not isinstance(doc, dict):
                         continue
-                    title = doc.get("title", "Без назви").strip()
-                    url = doc.get("url", "").strip()
-                    if url and title not in seen_titles:
-                        seen_titles.add(title)
-                        result.append((title, url))
+                    record = manifest_record(doc, group, bid_id=bid.get("id"), lot_id=lot.get("id"))
+                    if record["url"] and record["title"] not in seen_titles:
+                        seen_titles.add(record["title"])
+                        result.append(record)
     return result
 
 
-def parse_tender_documents(raw_data: dict) -> List[Tuple[str, str]]:
+def parse_tender_documents(raw_data: dict) -> List[dict]:
     try:
         if not raw_data:
             return []
@@ -270,6 +294,50 @@ def parse_tender_documents(raw_data: dict) -> List[Tuple[str, str]]:
         return []
 
 
+def process_tender(tender_id: str, cookies: Dict[str, str], base_name: str, source_idx: int,
+                   journal: Optional[WorkJournal] = None) -> Optional[int]:
+    """
+    detail → документы в HTML и манифест → тендер в базу.
+    В базу и в журнал (done) тендер попадает только после записи его документов в оба файла.
+    Возвращает число документов или None, если detail не получен или документы не сохранились.
+    """
+    detail = fetch_tender_detail(tender_id, cookies)
+    if not detail:
+        print(f" {tender_id} → detail не получен")
+        return None
+
+    docs = parse_tender_documents(detail)
+    count = len(docs)
+
+    if count > 0:
+        print(f"\n{tender_id} | документов: {count}")
+        # if DEBUG:
+        #     for doc in docs:
+        #         print(f" {doc['title']}")
+        #         print(f" {doc['url']}")
+        #         print("-" * 80)
+
+        # Передаё только имя без пути — функция сама разберётся
+        saved = save_files_as_html(tender_id, [(doc["title"], doc["url"]) for doc in docs], base_name, source_idx)
+        if not (saved and append_manifest(tender_id, docs, base_name, source_idx)):
+            # в базу не пишем — тендер обработается заново (при возобновлении или следующем запуске)
+            return None
+
+    # ────────────── [ВСТАВКА: вставка тендера в базу] ──────────────
+    inserted = sync_insert_tender_to_db(tender_id)
+
+    if DEBUG:
+        if inserted:
+            pass
+        else:
+            print(f"[DB ERROR] 🔴 Тендер {tender_id} НЕ вставлен (возможно уже есть)")
+    # ────────────────────────────────────────────────────────────────
+
+    if journal is not None:
+        journal.record_done([tender_id])
+    return count
+
+
 def main(source_idx: int):
     start_time = time.time()
     start_str = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(start_time))
@@ -290,102 +358,141 @@ def main(source_idx: int):
 
     cookies = get_random_cookies()
 
+    # до первой записи в HTML: перенести в манифест то, что собрано раньше
+    seed_manifest_from_html(base_name, source_idx)
+
     total_documents = 0
     processed_tenders = 0
     successful_tenders = 0
-    page = 1
-
-    while True:
-        params = search_params.copy()
-        if page > 1:
-            params["page"] = page
-
-        print(f"\n[PAGE {page}] Запрос страницы поиска...")
-        page_data = fetch_search_page(params, cookies)
+    pages_done = 0
+    incomplete = False
+
+    # журнал прерванного прохода: недообработанные тендеры — первыми, готовые страницы — пропускаем
+    journal = WorkJournal.open(source_idx, search_params) if USE_WORK_JOURNAL else None
+    if journal is not None and journal.resumed:
+        print(f"↩️  Возобновляем прерванный проход по журналу: {journal.summary()}")
+        for tender_id in journal.pending:
+            processed_tenders += 1
+            count = process_tender(tender_id, cookies, base_name, source_idx, journal)
+            if count:
+                successful_tenders += 1
+                total_documents += count
+
+    if journal is not None and journal.slices is not None:
+        slices = [(params, None) for params in journal.slices]
+    else:
+        slices, dropped = plan_slices_sync(search_params, lambda params: fetch_search_page(params, cookies))
+        if dropped:
+            # часть диапазонов не обойдена — план не сохраняем, при возобновлении он строится заново
+            print(f"🔴 Пропущено ценовых диапазонов: {len(dropped)} — проход будет неполным")
+            incomplete = True
+        elif journal is not None:
+            journal.record_plan([params for params, _ in slices])
+
+    if len(slices) > 1:
+        print(f"✂️  Поиск разбит на {len(slices)} ценовых диапазонов")
+
+    for slice_params, first_page in slices:
+        slice_key = params_key(slice_params)
+        done_pages = journal.pages_done(slice_key) if journal is not None else set()
+        if journal is not None and slice_key in journal.finished_slices:
+            continue
 
-        if DEBUG:
-            print(f'[DEB] {page_data}')
+        page = 1
+        slice_processed = 0
+        slice_failed = False
+
+        while True:
+            if page in done_pages:
+                # страница уже обработана до сбоя (журнал)
+                total, per_page = journal.slice_meta[slice_key]
+                if page >= -(-total // per_page):
+                    break
+                page += 1
+                continue
 
+            if page == 1 and first_page is not None:
+                page_data = first_page
+            else:
+                params = slice_params.copy()
+                params["page"] = page
 
-        if not page_data:
-            print(f"[PAGE {page}] Не удалось получить данные → прерываем")
-            break
+                print(f"\n[PAGE {page}] Запрос страницы поиска...")
+                page_data = fetch_search_page(params, cookies)
 
-        total = page_data.get("total", 0)
-        per_page = page_data.get("per_page", 100)
-        data_list = page_data.get("data", [])
+            pages_done += 1
 
-        # ── Проверка на подозрительно большое количество тендеров ──
-        TOTAL_ERROR_THRESHOLD = 10000  # вероятный баг
+            if DEBUG:
+                print(f'[DEB] {page_data}')
 
-        if total >= TOTAL_ERROR_THRESHOLD:
-            msg = f"🔴 [ОШИБКА] Найдено {total} тендеров — проверь URL или параметры! | {base_name}"
-            print(msg)
-            send_notification(msg)
-            return
+            if not page_data:
+                print(f"[PAGE {page}] Не удалось получить данные → прерываем")
+                slice_failed = incomplete = True
+                break
 
-        if not data_list:
-            print(f"[PAGE {page}] Пустой список тендеров → завершаем")
-            break
+            total = page_data.get("total", 0)
+            per_page = page_data.get("per_page", 100)
+            data_list = page_data.get("data", [])
 
-        tender_ids_on_page = extract_tender_ids_from_search(page_data)
+            # ── Проверка на подозрительно большое количество тендеров ──
+            if total >= RESULTS_CAP:
+                msg = f"🔴 [ОШИБКА] Найдено {total} тендеров — проверь URL или параметры! | {base_name}"
+                print(msg)
+                send_notification(msg)
+                return
 
-        pages_total = (total + 19) // 20
+            if not data_list:
+                print(f"[PAGE {page}] Пустой список тендеров → завершаем")
+                break
 
-        print(f"[PAGE {page}/{pages_total}] Найдено тендеров на странице: {len(tender_ids_on_page)} "
-              f"(всего в системе: {total})")
+            tender_ids_on_page = extract_tender_ids_from_search(page_data)
 
-        for idx, tender_id in enumerate(tender_ids_on_page, 1):
-            processed_tenders += 1
+            pages_total = (total + 19) // 20
 
-            if processed_tenders % 10 == 0:
-                print(f" Обработано тендеров всего: {processed_tenders}")
+            print(f"[PAGE {page}/{pages_total}] Найдено тендеров на странице: {len(tender_ids_on_page)} "
+                  f"(всего в системе: {total})")
 
-            if sync_tender_exists(tender_id):
-                if DEBUG:
-                    print(f"[DB] 🔷 Тендер {tender_id} уже в базе → пропускаем")
-                continue
+            existing_ids = sync_tenders_existing(tender_ids_on_page)
 
-            detail = fetch_tender_detail(tender_id, cookies)
-            if not detail:
-                print(f" {tender_id} → detail не получен")
-                continue
+            if journal is not None:
+                modified = {item["tenderID"]: item.get("dateModified") for item in data_list if "tenderID" in item}
+                journal.record_page(
+                    slice_key, page, total, per_page,
+                    {t: modified.get(t) for t in tender_ids_on_page if t not in existing_ids},
+                )
 
-            docs = parse_tender_documents(detail)
-            count = len(docs)
-            total_documents += count
+            for idx, tender_id in enumerate(tender_ids_on_page, 1):
+                processed_tenders += 1
+                slice_processed += 1
 
-            if count > 0:
-                successful_tenders += 1
-                print(f"\n{tender_id} | документов: {count}")
-                # if DEBUG:
-                #     for title, url in docs:
-                #         print(f" {title}")
-                #         print(f" {url}")
-                #         print("-" * 80)
+                if processed_tenders % 10 == 0:
+                    print(f" Обработано тендеров всего: {processed_tenders}")
 
-                # Передаё только имя без пути — функция сама разберётся
-                save_files_as_html(tender_id, docs, base_name, source_idx)
+                if tender_id in existing_ids:
+                    if DEBUG:
+                        print(f"[DB] 🔷 Тендер {tender_id} уже в базе → пропускаем")
+                    continue
 
-            # ────────────── [ВСТАВКА: вставка тендера в базу] ──────────────
-            inserted = sync_insert_tender_to_db(tender_id)
+                count = process_tender(tender_id, cookies, base_name, source_idx, journal)
+                if count:
+                    successful_tenders += 1
+                    total_documents += count
 
             if DEBUG:
-                if inserted:
-                    pass
-                else:
-                    print(f"[DB ERROR] 🔴 Тендер {tender_id} НЕ вставлен (возможно уже есть)")
-            # ────────────────────────────────────────────────────────────────
+                print(f"[PAGE {page}] Итого документов после страницы: {total_documents}")
 
-        if DEBUG:
-            print(f"[PAGE {page}] Итого документов после страницы: {total_documents}")
+            if len(data_list) < per_page or slice_processed >= total:
+                print("Достигнут конец результатов поиска")
+                break
 
-        if len(data_list) < per_page or processed_tenders >= total:
-            print("Достигнут конец результатов поиска")
-            break
+            page += 1
+            time.sleep(random.uniform(2.0, 4.5))
 
-        page += 1
-        time.sleep(random.uniform(2.0, 4.5))
+        if journal is not None and not slice_failed:
+            journal.record_slice_done(slice_key)
+
+    if journal is not None and not incomplete:
+        journal.clear()
 
     end_time = time.time()
     end_str = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(end_time))
@@ -394,7 +501,7 @@ def main(source_idx: int):
     minutes, seconds = divmod(remainder, 60)
 
     avg_tender_sec = duration_sec / processed_tenders if processed_tenders else 0
-    avg_page_sec = duration_sec / page if page else 0
+    avg_page_sec = duration_sec / pages_done if pages_done else 0
 
     avg_tender_m, avg_tender_s = divmod(int(avg_tender_sec), 60)
     avg_page_m, avg_page_s = divmod(int(avg_page_sec), 60)
@@ -416,6 +523,8 @@ def main(source_idx: int):
 
     # вывод в терминал
     print(msg)
+    print("\nЛимиты запросов (прокси/эндпоинт):")
+    print(format_rate_metrics())
 
     # отправка того же текста в Telegram
     send_notification(f"[Завершено] ✅✅✅ {base_name}\n\n{msg}")
@@ -427,7 +536,7 @@ def main(source_idx: int):
 
     if DOWNLOAD_FILES:
         print(f'Скачивание файлов...')
-        asyncio.run(start_download(filter_id=source_idx))
+        asyncio.run(start_download((source_idx,)))
 
 
 
@@ -452,4 +561,6 @@ if __name__ == "__main__":
                 msg = f"🔴 [ОШИБКА] source_idx={source_idx} завершился с исключением: {e}"
                 print(msg)
                 send_notification(f'[ERROR] Я упала - {msg}')
-                print("   Продолжаем следующий источник...")
\ No newline at end of file
+                print("   Продолжаем следующий источник...")
+
+    http_pool.close()
@@ -1,19 +1,37 @@
+import argparse
 import asyncio
+import os
 import random
+import re
 import time
-import os
+from collections import deque
+from datetime import datetime, timezone
 from functools import wraps
-from typing import Optional, Dict, List, Tuple
+from typing import Awaitable, Callable, Optional, Dict, List, Tuple
 from urllib.parse import urlparse, parse_qs
-from itertools import cycle
 
 import httpx
 from dotenv import load_dotenv
 
 from clients.data import cookies_list
+from clients.http_pool import http_pool, with_cookies
+from clients.proxy_pool import ProxyPool, load_proxies
 from sources import SOURCES
-from utils.funcs import save_files_as_html
-from db.crud import async_tender_exists, async_insert_tender_to_db
+from utils.manifest import compact_to_parquet, manifest_record
+from utils.output_sink import HtmlOutputSink, ManifestSink, OutputBarrier
+from utils.pipeline import Pipeline, Stage
+from utils.rate_limit import host_limiter, limiter_for, format_rate_metrics
+from utils.incremental import is_modified, parse_date_modified, with_modified_since
+from utils.search_ranges import RESULTS_CAP, VALUE_START_KEY, VALUE_END_KEY, plan_slices
+from utils.work_journal import WorkJournal, params_key
+from db.crud import (
+    async_get_source_checkpoint,
+    async_save_source_checkpoint,
+    async_tenders_existing,
+    async_tenders_modified,
+)
+from db.tender_index import SeenTenderIndex
+from db.tender_writer import TenderWriteBuffer
 from async_download_file import start_download
 from wakepy import keep
 from notifications.telegram import send_notification_async
@@ -22,29 +40,31 @@ load_dotenv()
 
 DEBUG = True
 DOWNLOAD_FILES = False
-WORKERS_COUNT = 1  # кол-во параллельных воркеров (расширяй до ~10)
+USE_TENDER_INDEX = True  # False — дедуп одним SELECT ... IN на страницу вместо индекса в памяти
+INCREMENTAL = False        # True — только тендеры, изменённые после чекпоинта источника (source_checkpoints)
+REPROCESS_MODIFIED = True  # уже обработанные тендеры, изменившиеся с прошлого раза (dateModified), обработать заново
+USE_WORK_JOURNAL = True    # журнал LOGS/journal/{idx}.jsonl: прерванный проход продолжается с места остановки
+DB_FLUSH_BATCH = 200     # write-behind: пишем tenders пачкой каждые N тендеров...
+DB_FLUSH_INTERVAL = 5.0  # ...или раз в T сек
+HTML_FLUSH_BATCH = 50      # output_data/*.html дописывается пачкой каждые N тендеров...
+HTML_FLUSH_INTERVAL = 2.0  # ...или раз в T сек
+MANIFEST_PARQUET = False   # после источника сжать JSONL-манифест в Parquet (нужен pyarrow)
+PAGE_PREFETCH_LIMIT = 4  # сколько страниц поиска запрашиваем одновременно
+SLICES_CONCURRENCY = 3   # сколько ценовых диапазонов (см. utils/search_ranges.py) обходим одновременно
+SOURCES_CONCURRENCY = 2  # сколько источников обрабатываем одновременно
+GLOBAL_WORKERS_LIMIT = 10  # сколько запросов detail/lots одновременно в работе по всем источникам
+
+# Конвейер тендера (utils/pipeline.py): воркеров на стадию и размер очереди между стадиями
+DETAIL_WORKERS = 6
+LOTS_WORKERS = 4
+SINK_WORKERS = 1
+STAGE_QUEUE_SIZE = 200
+PIPELINE_REPORT_INTERVAL = 30.0  # как часто печатать глубину очередей и скорость стадий, сек
 
 
 # ─── Прокси ───────────────────────────────────────────────────────────────────
 
-def load_proxies() -> List[str]:
-    raw = os.getenv("PROXIES", "")
-    proxies = [p.strip() for p in raw.split(",") if p.strip()]
-    if not proxies:
-        print("⚠️  [PROXY] Прокси не найдены в .env — работаем без прокси")
-    else:
-        print(f"✅ [PROXY] Загружено прокси: {len(proxies)} шт.")
-    return proxies
-
-
-PROXIES: List[str] = load_proxies()
-_proxy_cycle = cycle(PROXIES) if PROXIES else None
-
-
-def get_next_proxy() -> Optional[str]:
-    if _proxy_cycle is None:
-        return None
-    return next(_proxy_cycle)
+proxy_pool = ProxyPool(load_proxies())
 
 
 # ─── Cookies ──────────────────────────────────────────────────────────────────
@@ -75,8 +95,10 @@ def async_retry(max_attempts=80, base_delay=2.5, jitter=0.5):
                     if e.response.status_code == 429:
                         if DEBUG:
                             print(f"[429] Rate limit, попытка {attempt}/{max_attempts}")
-                    else:
-                        raise
+                        # паузу после 429 выдерживает общий AdaptiveRateLimiter, а не каждая корутина сама
+                        attempt += 1
+                        continue
+                    raise
                 except Exception as e:
                     print(f"[EXC] {func.__name__} → {type(e).__name__}: {e}")
                     if attempt == max_attempts:
@@ -93,17 +115,43 @@ def async_retry(max_attempts=80, base_delay=2.5, jitter=0.5):
     return decorator
 
 
-# ─── HTTP клиент с прокси ─────────────────────────────────────────────────────
-
-def make_client(proxy: Optional[str] = None) -> httpx.AsyncClient:
-    return httpx.AsyncClient(
-        proxy=proxy,
-        timeout=15,
-        follow_redirects=True,
-    )
+# ─── Fetch функции ────────────────────────────────────────────────────────────
 
+async def api_request(endpoint: str, method: str, url: str, **kwargs) -> httpx.Response:
+    """
+    Запрос через лучший на данный момент прокси (proxy_pool) и общий лимитер
+    (прокси, эндпоинт), под общим на хост потолком (host_limiter). На 429 лимитер снижает скорость и выбрасывается
+    HTTPStatusError — async_retry повторит запрос без своей паузы (уже через другой прокси, если он лучше).
+    cookies= уходят заголовком Cookie (with_cookies), а не в общий клиент.
+    """
+    kwargs["headers"] = with_cookies(kwargs.get("headers"), kwargs.pop("cookies", None))
+    proxy = proxy_pool.acquire()
+    limiter = limiter_for(proxy, endpoint)
+    ok, throttled = False, False
+    t0 = time.monotonic()
+    try:
+        await limiter.acquire()
+        await host_limiter(url, endpoint).acquire()
+        t0 = time.monotonic()
+        r = await http_pool.get_async(proxy).request(method, url, **kwargs)
+        throttled = r.status_code == 429
+        ok = r.status_code < 500 and not throttled
+    except asyncio.CancelledError:
+        # отменили мы сами (предзагрузка страниц, завершение) — прокси тут ни при чём
+        proxy_pool.cancel(proxy)
+        raise
+    except BaseException:
+        proxy_pool.report(proxy, time.monotonic() - t0, ok, throttled)
+        raise
+    proxy_pool.report(proxy, time.monotonic() - t0, ok, throttled)
+
+    if throttled:
+        limiter.on_throttle()
+        r.raise_for_status()
+    if r.is_success:
+        limiter.on_success()
+    return r
 
-# ─── Fetch функции ────────────────────────────────────────────────────────────
 
 HEADERS_BASE = {
     "accept": "application/json, text/plain, */*",
@@ -115,13 +163,19 @@ HEADERS_BASE = {
 
 
 @async_retry(max_attempts=80, base_delay=2.5)
-async def fetch_tender_detail(tender_id: str, client: httpx.AsyncClient) -> Optional[dict]:
+async def fetch_tender_detail(tender_id: str) -> Optional[dict]:
     url = f"https://prozorro.gov.ua/api/tenders/{tender_id}/details"
     try:
-        r = await client.get(url, headers=HEADERS_BASE, cookies=get_random_cookies())
+        r = await api_request("details", "GET", url, headers=HEADERS_BASE, cookies=get_random_cookies())
         r.raise_for_status()
         data = r.json()
         return data if data else None
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code == 429:
+            raise
+        if DEBUG:
+            print(f"[ERR detail] {tender_id} → {str(e)[:150].replace(chr(10), ' ')}")
+        return None
     except Exception as e:
         if DEBUG:
             print(f"[ERR detail] {tender_id} → {str(e)[:150].replace(chr(10), ' ')}")
@@ -129,12 +183,18 @@ async def fetch_tender_detail(tender_id: str, client: httpx.AsyncClient) -> Opti
 
 
 @async_retry(max_attempts=40, base_delay=3.0)
-async def fetch_tender_lots(tender_id: str, client: httpx.AsyncClient) -> Optional[dict]:
+async def fetch_tender_lots(tender_id: str) -> Optional[dict]:
     url = f"https://prozorro.gov.ua/api/tenders/{tender_id}/lots"
     try:
-        r = await client.get(url, headers=HEADERS_BASE, cookies=get_random_cookies())
+        r = await api_request("lots", "GET", url, headers=HEADERS_BASE, cookies=get_random_cookies())
         r.raise_for_status()
         return r.json()
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code == 429:
+            raise
+        if DEBUG:
+            print(f"[ERR lots] {tender_id} → {e}")
+        return None
     except Exception as e:
         if DEBUG:
             print(f"[ERR lots] {tender_id} → {e}")
@@ -142,15 +202,20 @@ async def fetch_tender_lots(tender_id: str, client: httpx.AsyncClient) -> Option
 
 
 @async_retry(max_attempts=20, base_delay=4.0)
-async def fetch_search_page(params: dict, client: httpx.AsyncClient) -> Optional[dict]:
+async def fetch_search_page(params: dict) -> Optional[dict]:
     url = "https://prozorro.gov.ua/api/search/tenders"
     try:
-        r = await client.post(url, headers=HEADERS_BASE, params=params, cookies=get_random_cookies())
+        r = await api_request("search", "POST", url, headers=HEADERS_BASE, params=params,
+                              cookies=get_random_cookies())
         print(f"  [SEARCH URL] {r.url}")
-        if r.status_code == 429:
-            return None
         r.raise_for_status()
         return r.json()
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code == 429:
+            raise
+        if DEBUG:
+            print(f"[ERR search page] → {e}")
+        return None
     except Exception as e:
         if DEBUG:
             print(f"[ERR search page] → {e}")
@@ -159,12 +224,15 @@ async def fetch_search_page(params: dict, client: httpx.AsyncClient) -> Optional
 
 # ─── Парсинг документов ───────────────────────────────────────────────────────
 
-def parse_bids_documents(bids: list) -> List[Tuple[str, str]]:
+def parse_bids_documents(bids: list) -> List[dict]:
+    """
+    Документы ставок из /details в виде записей манифеста (utils/manifest.py), без повторов URL.
+    """
     if not bids:
         return []
     result, seen = [], set()
     for bid in bids:
-        for group_docs in bid.get("publicDocuments", {}).values():
+        for group, group_docs in bid.get("publicDocuments", {}).items():
             for doc in group_docs:
                 if not isinstance(doc, dict):
                     continue
@@ -172,48 +240,31 @@ def parse_bids_documents(bids: list) -> List[Tuple[str, str]]:
                 if not url or url in seen:
                     continue
                 seen.add(url)
-                result.append((doc.get("title", "Без назви").strip(), url))
+                result.append(manifest_record(doc, group, bid_id=bid.get("id")))
     return result
 
 
-def parse_lots_documents(lots_data: dict) -> List[Tuple[str, str]]:
+def parse_lots_documents(lots_data: dict) -> List[dict]:
+    """
+    Документы ставок по лотам из /lots, без повторов названий.
+    """
     lots = lots_data.get("lots", [])
     if not lots:
         return []
     result, seen_titles = [], set()
     for lot in lots:
         for bid in lot.get("bids", []):
-            for group_docs in bid.get("publicDocuments", {}).values():
+            for group, group_docs in bid.get("publicDocuments", {}).items():
                 for doc in group_docs:
                     if not isinstance(doc, dict):
                         continue
-                    title = doc.get("title", "Без назви").strip()
-                    url = doc.get("url", "").strip()
-                    if url and title not in seen_titles:
-                        seen_titles.add(title)
-                        result.append((title, url))
+                    record = manifest_record(doc, group, bid_id=bid.get("id"), lot_id=lot.get("id"))
+                    if record["url"] and record["title"] not in seen_titles:
+                        seen_titles.add(record["title"])
+                        result.append(record)
     return result
 
 
-async def parse_tender_documents(raw_data: dict, client: httpx.AsyncClient) -> List[Tuple[str, str]]:
-    try:
-        if not raw_data:
-            return []
-        if raw_data.get("lots"):
-            lots_data = await fetch_tender_lots(raw_data["tenderID"], client)
-            return parse_lots_documents(lots_data) if lots_data else []
-        bids = raw_data.get("bids")
-        if bids:
-            return parse_bids_documents(bids)
-        return []
-    except Exception as e:
-        tender_id = raw_data.get("tenderID", "unknown")
-        msg = f"⚠️ [WARN] parse_tender_documents тендер {tender_id} → {e}"
-        print(msg)
-        await send_notification_async(msg)
-        return []
-
-
 # ─── Вспомогательные ──────────────────────────────────────────────────────────
 
 def build_query_params(query_params: dict) -> dict:
@@ -222,9 +273,15 @@ def build_query_params(query_params: dict) -> dict:
     for key, values in query_params.items():
         if key in KEYS_WITHOUT_INDEX:
             result[key] = values[0]
+        elif key == "value.start":
+            result[VALUE_START_KEY] = values[0]
+        elif key == "value.end":
+            result[VALUE_END_KEY] = values[0]
         else:
             for i, value in enumerate(values):
                 result[f"{key}[{i}]"] = value
+    if VALUE_START_KEY in result or VALUE_END_KEY in result:
+        result["value[currency]"] = "UAH"
     return result
 
 
@@ -234,119 +291,278 @@ def extract_tender_ids(response: dict) -> List[str]:
 
 # ─── Producer ─────────────────────────────────────────────────────────────────
 
-async def producer(search_params: dict, queue: asyncio.Queue, stats: dict):
-    proxy = get_next_proxy()
-    async with make_client(proxy) as client:
-        page = 1
-        while True:
-            params = search_params.copy()
-            if page > 1:
-                params["page"] = page
+async def fetch_page(page: int, search_params: dict) -> Optional[dict]:
+    params = search_params.copy()
+    if page > 1:
+        params["page"] = page
+    print(f"\n[PRODUCER] 📄 Страница {page}...")
+    return await fetch_search_page(params)
+
+
+async def enqueue_page(page: int, page_data: dict, queue: asyncio.Queue, stats: dict,
+                       seen_index: Optional[SeenTenderIndex],
+                       journal: Optional[WorkJournal] = None, slice_key: Optional[str] = None):
+    tender_ids = extract_tender_ids(page_data)
+    print(f"[PRODUCER] Страница {page}: {len(tender_ids)} тендеров (всего в системе: {page_data.get('total', 0)})")
 
-            print(f"\n[PRODUCER] 📄 Страница {page}...")
-            page_data = await fetch_search_page(params, client)
+    modified = {
+        item["tenderID"]: parse_date_modified(item.get("dateModified"))
+        for item in page_data.get("data", []) if "tenderID" in item
+    }
+    page_max = max((dm for dm in modified.values() if dm is not None), default=None)
+    if page_max is not None and (stats["max_date_modified"] is None or page_max > stats["max_date_modified"]):
+        stats["max_date_modified"] = page_max
 
+    if seen_index is not None:
+        existing = {t for t in tender_ids if t in seen_index}
+    else:
+        existing = await async_tenders_existing(tender_ids)
+
+    # только в инкрементальном режиме: в полном проходе это был бы лишний SELECT на каждую страницу
+    changed = set()
+    if REPROCESS_MODIFIED and stats["incremental"] and existing:
+        stored = await async_tenders_modified(t for t in existing if modified.get(t) is not None)
+        changed = {t for t, dm in stored.items() if is_modified(modified[t], dm, stats["checkpoint"])}
+
+    to_queue = []
+    for tender_id in tender_ids:
+        if tender_id in existing and tender_id not in changed:
+            if DEBUG:
+                print(f"[DB] 🔷 {tender_id} уже в базе → пропускаем")
+            stats["skipped"] += 1
+            continue
+        # соседние ценовые диапазоны пересекаются по границе
+        if tender_id in stats["queued"]:
+            continue
+        if tender_id in changed:
+            print(f"[DB] 🔄 {tender_id} изменён с прошлой обработки → обрабатываем заново")
+            stats["reprocessed"] += 1
+            stats["revisit"].add(tender_id)
+        stats["queued"].add(tender_id)
+        stats["modified"][tender_id] = modified.get(tender_id)
+        to_queue.append(tender_id)
+
+    # сначала в журнал, потом в очередь: упавший процесс не потеряет тендеры из очереди
+    if journal is not None:
+        journal.record_page(
+            slice_key, page, page_data.get("total", 0), page_data.get("per_page", 100),
+            {t: modified[t].isoformat() if modified.get(t) else None for t in to_queue},
+        )
+    for tender_id in to_queue:
+        await queue.put(tender_id)
+
+
+async def producer(search_params: dict, queue: asyncio.Queue, stats: dict,
+                   seen_index: Optional[SeenTenderIndex], first_page: Optional[dict] = None,
+                   journal: Optional[WorkJournal] = None):
+    """
+    Первая страница запрашивается одна (из неё берём total и per_page), остальные —
+    параллельно, не более PAGE_PREFETCH_LIMIT одновременно, раскидывая по прокси.
+    В очередь тендеры попадают строго в порядке страниц.
+    first_page — уже полученная при разбиении на диапазоны первая страница.
+    journal — страницы, уже отмеченные в журнале, повторно не запрашиваются.
+    """
+    slice_key = params_key(search_params)
+    done_pages = journal.pages_done(slice_key) if journal is not None else set()
+    if journal is not None and slice_key in journal.finished_slices:
+        print("[PRODUCER] ↩️  Диапазон уже обойдён (журнал) — пропускаем")
+        return
+
+    pending: deque[Tuple[int, asyncio.Task]] = deque()
+    complete = False
+
+    try:
+        if 1 in done_pages:
+            total, per_page = journal.slice_meta[slice_key]
+            print(f"[PRODUCER] ↩️  Продолжаем диапазон: готово страниц {len(done_pages)}")
+        else:
+            page_data = first_page or await fetch_page(1, search_params)
             if not page_data:
-                print(f"[PRODUCER] ❌ Страница {page} — нет данных, завершаем")
-                break
+                print("[PRODUCER] ❌ Страница 1 — нет данных, завершаем")
+                stats["incomplete"] = True
+                return
 
             total = page_data.get("total", 0)
             per_page = page_data.get("per_page", 100)
             data_list = page_data.get("data", [])
 
-            if total >= 10000:
+            if total >= RESULTS_CAP:
                 print(f"🔴 [PRODUCER] Найдено {total} тендеров — подозрительно много, прерываем!")
-                break
+                stats["incomplete"] = True
+                return
             elif total >= 5000:
                 print(f"⚠️  [PRODUCER] Найдено {total} тендеров (~{(total // per_page) + 1} стр.)")
 
             if not data_list:
-                print(f"[PRODUCER] ✅ Страница {page} пуста — конец результатов")
-                break
+                print("[PRODUCER] ✅ Страница 1 пуста — конец результатов")
+                complete = True
+                return
 
-            tender_ids = extract_tender_ids(page_data)
-            print(f"[PRODUCER] Страница {page}: {len(tender_ids)} тендеров (всего в системе: {total})")
+            await enqueue_page(1, page_data, queue, stats, seen_index, journal, slice_key)
 
-            for tender_id in tender_ids:
-                # TODO: заменить на async версию
-                if await async_tender_exists(tender_id):
-                    if DEBUG:
-                        print(f"[DB] 🔷 {tender_id} уже в базе → пропускаем")
-                    stats["skipped"] += 1
-                    continue
-                await queue.put(tender_id)
-
-            if len(data_list) < per_page or stats.get("processed_total", 0) >= total:
+            if len(data_list) < per_page:
                 print("[PRODUCER] ✅ Достигнут конец результатов")
-                break
-
-            page += 1
-            await asyncio.sleep(random.uniform(1.5, 3.0))
-
-    await queue.put(None)  # сигнал завершения
-
+                complete = True
+                return
 
-# ─── Worker ───────────────────────────────────────────────────────────────────
+        pages_total = -(-total // per_page)
+        next_page = 2
 
-async def worker(worker_id: int, queue: asyncio.Queue, base_name: str, source_idx: int,
-                 stats: dict, stop_event: asyncio.Event):
-    proxy = PROXIES[worker_id % len(PROXIES)] if PROXIES else None
-    proxy_label = proxy.split("@")[-1] if proxy else "без прокси"
-    print(f"[WORKER-{worker_id}] 🚀 Старт | прокси: {proxy_label}")
+        while pending or next_page <= pages_total:
+            while next_page <= pages_total and len(pending) < PAGE_PREFETCH_LIMIT:
+                if next_page not in done_pages:
+                    task = asyncio.create_task(fetch_page(next_page, search_params))
+                    pending.append((next_page, task))
+                next_page += 1
 
-    async with make_client(proxy) as client:
-        while not stop_event.is_set():
-            try:
-                tender_id = await asyncio.wait_for(queue.get(), timeout=30)
-            except asyncio.TimeoutError:
-                if stop_event.is_set():
-                    break
-                continue
-
-            if tender_id is None:
-                # Передаём сигнал дальше для других воркеров
-                await queue.put(None)
-                stop_event.set()
+            if not pending:
                 break
 
-            async with stats["lock"]:
-                stats["processed_total"] += 1
-                count_so_far = stats["processed_total"]
-
-            if count_so_far % 10 == 0:
-                print(f"[WORKER-{worker_id}] 📊 Обработано всего: {count_so_far}")
+            page, task = pending.popleft()
+            page_data = await task
 
-            detail = await fetch_tender_detail(tender_id, client)
-            if not detail:
-                print(f"[WORKER-{worker_id}] ⚠️  {tender_id} → detail не получен")
-                queue.task_done()
-                continue
+            if not page_data:
+                print(f"[PRODUCER] ❌ Страница {page} — нет данных, завершаем")
+                stats["incomplete"] = True
+                return
 
-            docs = await parse_tender_documents(detail, client)
-            count = len(docs)
+            data_list = page_data.get("data", [])
+            if not data_list:
+                print(f"[PRODUCER] ✅ Страница {page} пуста — конец результатов")
+                break
 
-            async with stats["lock"]:
-                stats["total_documents"] += count
+            await enqueue_page(page, page_data, queue, stats, seen_index, journal, slice_key)
 
-            if count > 0:
+            if len(data_list) < per_page:
+                print("[PRODUCER] ✅ Достигнут конец результатов")
+                break
+        complete = True
+    finally:
+        for _, task in pending:
+            task.cancel()
+        if complete and journal is not None:
+            journal.record_slice_done(slice_key)
+
+
+async def produce_all(search_params: dict, queue: asyncio.Queue, stats: dict,
+                      seen_index: Optional[SeenTenderIndex], journal: Optional[WorkJournal] = None):
+    """
+    Делит поиск на ценовые диапазоны до < 10 000 результатов и обходит их
+    параллельно (SLICES_CONCURRENCY), все продюсеры пишут в одну очередь —
+    входную очередь стадии detail. При возобновлении диапазоны берутся из журнала.
+    """
+    if journal is not None and journal.slices is not None:
+        slices = [(params, None) for params in journal.slices]
+    else:
+        slices, dropped = await plan_slices(search_params, lambda params: fetch_page(1, params))
+        if dropped:
+            # часть диапазонов не обойдена — план не сохраняем, при возобновлении он строится заново
+            print(f"🔴 [PRODUCER] Пропущено ценовых диапазонов: {len(dropped)} — проход будет неполным")
+            stats["incomplete"] = True
+        elif journal is not None:
+            journal.record_plan([params for params, _ in slices])
+
+    if len(slices) > 1:
+        print(f"[PRODUCER] ✂️  Поиск разбит на {len(slices)} ценовых диапазонов")
+
+    sem = asyncio.Semaphore(SLICES_CONCURRENCY)
+
+    async def run_slice(params: dict, first_page: Optional[dict]):
+        async with sem:
+            await producer(params, queue, stats, seen_index, first_page, journal)
+
+    await asyncio.gather(*(run_slice(params, first_page) for params, first_page in slices))
+
+
+# ─── Конвейер обработки тендеров ─────────────────────────────────────────────
+
+def build_pipeline(source_idx: int, stats: dict, sink: HtmlOutputSink, manifest: ManifestSink,
+                   barrier: OutputBarrier, record_tender: Callable[[str], Awaitable[None]],
+                   budget: asyncio.Semaphore) -> Pipeline:
+    """
+    detail → lots → sink (HTML + JSONL-манифест, utils/output_sink.py). У каждой стадии своя ограниченная очередь и свой
+    пул воркеров: медленные /lots не держат запросы /details, запись файла и БД не держат сеть.
+    Тендеры без лотов идут из detail сразу в sink.
+    В tenders (record_tender) тендер попадает только после того, как его блоки записаны в оба файла
+    (barrier); тендеры без документов — сразу.
+    budget — общий на все источники лимит одновременных запросов detail/lots.
+    """
+
+    async def on_detail(tender_id: str):
+        async with stats["lock"]:
+            stats["processed_total"] += 1
+            count_so_far = stats["processed_total"]
+        if count_so_far % 10 == 0:
+            print(f"[DETAIL] 📊 Обработано всего: {count_so_far}")
+
+        async with budget:
+            detail = await fetch_tender_detail(tender_id)
+        if not detail:
+            print(f"[DETAIL] ⚠️  {tender_id} → detail не получен")
+            # тендер не записан в tenders; чекпоинт не должен уйти дальше его dateModified
+            failed_modified = stats["modified"].pop(tender_id, None)
+            if failed_modified is not None:
                 async with stats["lock"]:
-                    stats["successful_tenders"] += 1
-                print(f"[WORKER-{worker_id}] ✅ {tender_id} | документов: {count}")
-                save_files_as_html(tender_id, docs, base_name, source_idx)
+                    if stats["failed_min_modified"] is None or failed_modified < stats["failed_min_modified"]:
+                        stats["failed_min_modified"] = failed_modified
+            return
 
-            # TODO: заменить на async версию
-            inserted = await async_insert_tender_to_db(tender_id)
-            if DEBUG and not inserted:
-                print(f"[DB ERROR] 🔴 {tender_id} НЕ вставлен")
+        if detail.get("lots"):
+            await lots_stage.put(tender_id)
+        else:
+            await sink_stage.put((tender_id, parse_bids_documents(detail.get("bids"))))
+
+    async def on_lots(tender_id: str):
+        async with budget:
+            lots_data = await fetch_tender_lots(tender_id)
+        await sink_stage.put((tender_id, parse_lots_documents(lots_data) if lots_data else []))
+
+    async def on_sink(item: Tuple[str, List[dict]]):
+        tender_id, docs = item
+        count = len(docs)
+        async with stats["lock"]:
+            stats["total_documents"] += count
+            if count > 0:
+                stats["successful_tenders"] += 1
+        # переобработанный тендер: в каждый файл — только документы, которых в нём ещё нет;
+        # файлы вывода читаются только ради таких тендеров
+        html_docs, manifest_docs = docs, docs
+        if tender_id in stats["revisit"]:
+            stats["revisit"].discard(tender_id)
+            html_docs = await sink.new_documents(tender_id, docs)
+            manifest_docs = await manifest.new_documents(tender_id, docs)
+        blocks = bool(html_docs) + bool(manifest_docs)
+        if blocks:
+            print(f"[SINK] ✅ {tender_id} | документов: {max(len(html_docs), len(manifest_docs))}")
+            barrier.expect(tender_id, blocks)
+            if html_docs:
+                await sink.add(tender_id, [(doc["title"], doc["url"]) for doc in html_docs])
+            if manifest_docs:
+                await manifest.add(tender_id, manifest_docs)
+        else:
+            if count > 0:
+                print(f"[SINK] 🔷 {tender_id} | новых документов нет — вывод не меняется")
+            await record_tender(tender_id)
 
-            queue.task_done()
+    detail_stage = Stage("detail", on_detail, DETAIL_WORKERS, STAGE_QUEUE_SIZE)
+    lots_stage = Stage("lots", on_lots, LOTS_WORKERS, STAGE_QUEUE_SIZE)
+    sink_stage = Stage("sink", on_sink, SINK_WORKERS, STAGE_QUEUE_SIZE)
 
-    print(f"[WORKER-{worker_id}] 🏁 Завершил работу")
+    return Pipeline([detail_stage, lots_stage, sink_stage],
+                    name=str(source_idx), report_interval=PIPELINE_REPORT_INTERVAL)
 
 
 # ─── Main ─────────────────────────────────────────────────────────────────────
 
-async def run_source(source_idx: int):
+async def run_source(source_idx: int, seen_index: Optional[SeenTenderIndex] = None,
+                     budget: Optional[asyncio.Semaphore] = None, incremental: bool = INCREMENTAL):
+    """
+    incremental — запрашивать только тендеры, изменённые после чекпоинта источника.
+    Чекпоинт (max dateModified) сохраняется после каждого прохода, в котором все страницы
+    поиска были получены: при обрыве следующий инкрементальный запуск ничего не потеряет.
+    Сам обрыв подхватывает журнал (utils/work_journal.py): готовые страницы не запрашиваются,
+    недообработанные тендеры идут в работу первыми.
+    """
     source = SOURCES.get(source_idx, {})
     if not source or "url" not in source:
         print(f"❌ Нет источника с idx={source_idx}")
@@ -362,75 +578,237 @@ async def run_source(source_idx: int):
         "successful_tenders": 0,
         "total_documents": 0,
         "skipped": 0,
+        "reprocessed": 0,
+        "queued": set(),
+        "revisit": set(),            # тендеры, блоки которых уже могут быть в output_data (см. on_sink)
+        "modified": {},              # tender_id → dateModified (UTC), пока тендер в конвейере
+        "max_date_modified": None,   # максимум dateModified в выдаче — будущий чекпоинт
+        "checkpoint": None,
+        "incremental": incremental,  # только тогда уже обработанные тендеры проверяются на изменения
+        "failed_min_modified": None, # самый ранний dateModified тендера, который не удалось обработать
+        "incomplete": False,         # не все страницы поиска получены — чекпоинт не двигаем
         "lock": asyncio.Lock(),
     }
 
-    queue: asyncio.Queue = asyncio.Queue(maxsize=200)
-    stop_event = asyncio.Event()
-
-    workers = [
-        asyncio.create_task(
-            worker(i, queue, base_name, source_idx, stats, stop_event)
+    crawl_started = datetime.now(timezone.utc).replace(tzinfo=None)
+    if incremental:
+        checkpoint = await async_get_source_checkpoint(source_idx)
+        if checkpoint is not None and checkpoint.max_date_modified is not None:
+            stats["checkpoint"] = checkpoint.max_date_modified
+            search_params = with_modified_since(search_params, checkpoint.max_date_modified)
+            print(f"[{source_idx}] ⏩ Инкрементально: изменённые после {checkpoint.max_date_modified:%Y-%m-%d %H:%M} UTC")
+        else:
+            print(f"[{source_idx}] Чекпоинта нет — полный проход")
+
+    journal = WorkJournal.open(source_idx, search_params) if USE_WORK_JOURNAL else None
+    resumed: Dict[str, Optional[str]] = {}
+    if journal is not None and journal.resumed:
+        resumed = journal.pending
+        print(f"[{source_idx}] ↩️  Возобновляем прерванный проход по журналу: {journal.summary()}")
+        stats["queued"].update(journal.queued)
+        stats["revisit"].update(resumed)
+        for tender_id, date_modified in journal.queued.items():
+            dm = parse_date_modified(date_modified)
+            if tender_id in resumed:
+                stats["modified"][tender_id] = dm
+            if dm is not None and (stats["max_date_modified"] is None or dm > stats["max_date_modified"]):
+                stats["max_date_modified"] = dm
+
+    if seen_index is None and USE_TENDER_INDEX:
+        seen_index = await SeenTenderIndex.load()
+    if budget is None:
+        budget = asyncio.Semaphore(GLOBAL_WORKERS_LIMIT)
+
+    # done в журнале — после коммита пачки в tenders, а туда тендер попадает только после записи
+    # его блоков в HTML и манифест (OutputBarrier): done означает «сохранён полностью»
+    on_flushed = journal.record_done if journal is not None else None
+    async with TenderWriteBuffer(DB_FLUSH_BATCH, DB_FLUSH_INTERVAL, seen_index, on_flushed) as writer:
+
+        async def record_tender(tender_id: str):
+            await writer.add(tender_id, stats["modified"].pop(tender_id, None))
+
+        # в writer тендер попадает из on_flushed sink-ов — после записи его блоков в файлы;
+        # sink-и закрываются раньше writer, их последние пачки успевают в tenders
+        barrier = OutputBarrier(record_tender)
+        async with HtmlOutputSink(base_name, source_idx, HTML_FLUSH_BATCH, HTML_FLUSH_INTERVAL, barrier.flushed) as sink, \
+                ManifestSink(base_name, source_idx, HTML_FLUSH_BATCH, HTML_FLUSH_INTERVAL, barrier.flushed) as manifest:
+            pipeline = build_pipeline(source_idx, stats, sink, manifest, barrier, record_tender, budget)
+            pipeline.start()
+            try:
+                for tender_id in resumed:
+                    await pipeline.stages[0].put(tender_id)
+                await produce_all(search_params, pipeline.stages[0].queue, stats, seen_index, journal)
+            finally:
+                # стадии закрываются по очереди, каждая дорабатывает свою очередь
+                await pipeline.close()
+        if any(stage.errors for stage in pipeline.stages):
+            stats["incomplete"] = True
+        if len(barrier):
+            # блоки не удалось дописать в файлы — эти тендеры не записаны в tenders
+            print(f"[{source_idx}] 🔴 Не сохранено в output_data: {len(barrier)} тендеров")
+            stats["incomplete"] = True
+    if writer.unflushed:
+        # последняя пачка не записалась в tenders — эти тендеры не отмечены в журнале как done
+        stats["incomplete"] = True
+
+    if stats["incomplete"]:
+        print(f"[{source_idx}] ⚠️  Проход неполный (страницы поиска / ошибки стадий) — чекпоинт не обновлён")
+        if journal is not None:
+            print(f"[{source_idx}] 📒 Журнал сохранён ({journal.summary()}) — следующий запуск продолжит с этого места")
+    else:
+        if journal is not None:
+            journal.clear()
+        new_checkpoint = min(
+            (dm for dm in (stats["max_date_modified"], stats["failed_min_modified"]) if dm is not None),
+            default=None,
         )
-        for i in range(WORKERS_COUNT)
-    ]
-
-    prod = asyncio.create_task(producer(search_params, queue, stats))
+        if await async_save_source_checkpoint(source_idx, crawl_started, new_checkpoint) and new_checkpoint:
+            print(f"[{source_idx}] 💾 Чекпоинт: dateModified до {new_checkpoint:%Y-%m-%d %H:%M} UTC")
 
-    await asyncio.gather(prod, *workers)
+    if MANIFEST_PARQUET and os.path.exists(manifest.path):
+        await asyncio.to_thread(compact_to_parquet, manifest.path)
 
     return stats
 
 
-async def main_async():
-    source_indexes = (5,)
+async def run_source_reported(source_idx: int, seen_index: Optional[SeenTenderIndex],
+                              budget: asyncio.Semaphore, incremental: bool = INCREMENTAL):
+    """
+    run_source + уведомления о старте/падении и итоговый отчёт по источнику.
+    """
+    source_name = SOURCES.get(source_idx, {}).get("name")
 
-    for source_idx in source_indexes:
-        print(f"\n{'='*100}")
-        msg = f"▶️  Запуск source_idx={source_idx}"
-        print(msg)
-        await send_notification_async(msg)
-        print(f"{'='*100}")
+    print(f"\n{'='*100}")
+    msg = f"▶️  Запуск source_idx={source_idx} | {source_name}"
+    print(msg)
+    await send_notification_async(msg)
+    print(f"{'='*100}")
+
+    start_time = time.time()
+    start_str = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(start_time))
+    print(f"[{source_idx}] Скрипт запущен: {start_str}")
 
-        start_time = time.time()
-        start_str = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(start_time))
-        print(f"Скрипт запущен: {start_str}")
+    try:
+        stats = await run_source(source_idx, seen_index, budget, incremental)
+    except Exception as e:
+        msg = f"🔴 [ОШИБКА] source_idx={source_idx} завершился с исключением: {e}"
+        print(msg)
+        await send_notification_async(f"[ERROR] Я упала - {msg}")
+        return
 
+    end_time = time.time()
+    end_str = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(end_time))
+    duration_sec = end_time - start_time
+    hours, remainder = divmod(int(duration_sec), 3600)
+    minutes, seconds = divmod(remainder, 60)
+
+    msg = (
+        f"Завершено.\n"
+        f"Старт:    {start_str}\n"
+        f"Финиш:    {end_str}\n"
+        f"Время работы: {hours:02d}:{minutes:02d}:{seconds:02d} ({duration_sec:.1f} сек)\n"
+    )
+    if stats:
+        msg += (
+            f"\n"
+            f"Всего обработано тендеров:          {stats['processed_total']:>6}\n"
+            f"Пропущено (уже в базе):             {stats['skipped']:>6}\n"
+            f"Повторно (изменились с прошлого):   {stats['reprocessed']:>6}\n"
+            f"Тендеров с документами (успешных):  {stats['successful_tenders']:>6}\n"
+            f"Всего собрано документов:           {stats['total_documents']:>6}\n"
+        )
+        if stats["successful_tenders"] > 0:
+            avg = stats["total_documents"] / stats["successful_tenders"]
+            msg += f"Среднее документов на тендер:       {avg:>9.2f}\n"
+
+    print("\n" + "="*100)
+    print(f"[{source_idx}] {source_name}")
+    print(msg, end="")
+    print("\nЛимиты запросов (прокси/эндпоинт):")
+    print(format_rate_metrics())
+    print("\nПрокси:")
+    print(proxy_pool.summary())
+    print("="*100)
+    await send_notification_async(f"[Завершено] ✅ {source_idx}. {source_name}\n\n{msg}")
+
+    if DOWNLOAD_FILES:
+        print("📥 Скачивание файлов...")
         try:
-            stats = await run_source(source_idx)
+            await start_download((source_idx,))
         except Exception as e:
-            msg = f"🔴 [ОШИБКА] source_idx={source_idx} завершился с исключением: {e}"
+            # ошибка загрузки одного источника не должна обрывать остальные (main_async закрыл бы http_pool)
+            msg = f"🔴 [ОШИБКА] Скачивание файлов source_idx={source_idx}: {e}"
             print(msg)
             await send_notification_async(f"[ERROR] Я упала - {msg}")
-            print("Продолжаем следующий источник...")
+
+
+async def main_async(source_indexes: Tuple[int, ...] = (5,), parallel: int = SOURCES_CONCURRENCY,
+                     incremental: bool = INCREMENTAL):
+    """
+    Запускает несколько источников одновременно (не более parallel).
+    Лимит запросов к хосту (utils/rate_limit.py) и бюджет запросов GLOBAL_WORKERS_LIMIT
+    общие на все источники.
+    """
+    # индекс строится один раз и переиспользуется всеми источниками
+    seen_index = await SeenTenderIndex.load() if USE_TENDER_INDEX else None
+    budget = asyncio.Semaphore(GLOBAL_WORKERS_LIMIT)
+    sources_sem = asyncio.Semaphore(parallel)
+
+    async def run_one(source_idx: int):
+        async with sources_sem:
+            await run_source_reported(source_idx, seen_index, budget, incremental)
+
+    health_task = asyncio.create_task(proxy_pool.run_health_checks())
+    try:
+        await asyncio.gather(*(run_one(idx) for idx in source_indexes))
+    finally:
+        health_task.cancel()
+        await http_pool.aclose()
+
+
+def select_sources(indexes: Optional[List[int]] = None, status: Optional[str] = None,
+                   name_pattern: Optional[str] = None) -> Tuple[int, ...]:
+    """
+    Выбор источников из SOURCES: по индексам, по подстроке статуса ('awaits' найдёт '🟡awaits')
+    и/или по regex по имени. Фильтры объединяются через И.
+    """
+    selected = []
+    for idx, source in SOURCES.items():
+        if indexes and idx not in indexes:
+            continue
+        if status and status.lower() not in source.get("status", "").lower():
+            continue
+        if name_pattern and not re.search(name_pattern, source.get("name", ""), re.IGNORECASE):
             continue
+        if not source.get("url", "").startswith("http"):
+            continue
+        selected.append(idx)
+    return tuple(selected)
+
 
-        end_time = time.time()
-        end_str = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(end_time))
-        duration_sec = end_time - start_time
-        hours, remainder = divmod(int(duration_sec), 3600)
-        minutes, seconds = divmod(remainder, 60)
-
-        print("\n" + "="*100)
-        print("Завершено.")
-        print(f"Старт:    {start_str}")
-        print(f"Финиш:    {end_str}")
-        print(f"Время работы: {hours:02d}:{minutes:02d}:{seconds:02d} ({duration_sec:.1f} сек)")
-        if stats:
-            print(f"Всего обработано тендеров:          {stats['processed_total']:>6}")
-            print(f"Пропущено (уже в базе):             {stats['skipped']:>6}")
-            print(f"Тендеров с документами (успешных):  {stats['successful_tenders']:>6}")
-            print(f"Всего собрано документов:           {stats['total_documents']:>6}")
-            if stats["successful_tenders"] > 0:
-                avg = stats["total_documents"] / stats["successful_tenders"]
-                print(f"Среднее документов на тендер:       {avg:>9.2f}")
-        print("="*100)
-
-        if DOWNLOAD_FILES:
-            print("📥 Скачивание файлов...")
-            await start_download(filter_id=source_idx)
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Сбор документов Prozorro по источникам из sources.py")
+    parser.add_argument("--ids", type=int, nargs="*", help="индексы источников, напр. --ids 42 48 49")
+    parser.add_argument("--status", help="подстрока статуса, напр. --status awaits")
+    parser.add_argument("--name", help="regex по имени источника, напр. --name 'Фармацевтична'")
+    parser.add_argument("--parallel", type=int, default=SOURCES_CONCURRENCY,
+                        help=f"сколько источников обрабатывать одновременно (по умолчанию {SOURCES_CONCURRENCY})")
+    parser.add_argument("--incremental", action="store_true", default=INCREMENTAL,
+                        help="только тендеры, изменённые после прошлого полного прохода источника")
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
-    with keep.running():
-        asyncio.run(main_async())
\ No newline at end of file
+    args = parse_args()
+
+    if args.ids or args.status or args.name:
+        source_indexes = select_sources(args.ids, args.status, args.name)
+    else:
+        source_indexes = (5,)
+
+    if not source_indexes:
+        print("❌ Под фильтры не попал ни один источник")
+    else:
+        print(f"Источники ({len(source_indexes)}): {', '.join(map(str, source_indexes))}")
+        with keep.running():
+            asyncio.run(main_async(source_indexes, args.parallel, args.incremental))
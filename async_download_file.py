@@ -1,14 +1,21 @@
 import asyncio
 import hashlib
+import json
+import random
 from pathlib import Path
 
 import aiohttp
-from bs4 import BeautifulSoup
 
-from db.core.session import AsyncSessionLocal
-from db.crud import file_hash_exists, insert_file_hash
+from db.crud import async_document_urls_known, async_upsert_document_url
+from db.hash_registry import FileHashRegistry
 
 from sources import SOURCES
+from utils.blob_store import blob_path, blob_root_for, link_view, store_blob
+from utils.funcs import output_html_path, output_manifest_path
+from utils.hashing import hash_file_into, run_in_hash_pool, write_and_hash
+from utils.html_links import iter_links
+from utils.manifest import read_manifest
+from utils.text_match import matcher_for, normalize_title
 from notifications.telegram import send_notification_async
 
 
@@ -48,99 +55,267 @@ STOP_WORDS = (
     "люк"
 )
 
+DEBUG = False  # True — отчёт загрузки в Telegram по каждому источнику
 
-async def download_single_file(session, db, sem, idx, file_name, url, save_dir):
+DOWNLOAD_CHUNK_SIZE = 256 * 1024  # байт; столько максимум держит в памяти одна загрузка
+VERIFY_KNOWN_URLS = False  # True — уже скачанные URL перепроверять HEAD-запросом (ETag / Content-Length)
+
+RESUMABLE_DOWNLOADS = True  # не удалять .part при обрыве, докачивать через Range (состояние в {имя}.part.json)
+DOWNLOAD_ATTEMPTS = 5
+DOWNLOAD_RETRY_DELAY = 2.0  # сек, удваивается с каждой попыткой
+# без общего лимита: большой файл на медленном сервере качается сколько нужно, пока идут данные
+DOWNLOAD_TIMEOUT = aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=60)
+
+
+async def url_unchanged(session, url: str, known) -> bool:
+    """
+    Условный HEAD для уже скачанного URL: 304, тот же ETag или тот же Content-Length — не изменился.
+    Если сервер не даёт ни того, ни другого (или HEAD не прошёл) — верим кешу.
     """
-    Скачивает один файл.
+    headers = {}
+    if known.etag:
+        headers["If-None-Match"] = known.etag
+    if known.last_modified:
+        headers["If-Modified-Since"] = known.last_modified
 
-    Возвращает:
-        "saved"     — успешно сохранён
-        "exists"    — уже есть в базе
-        "error"     — ошибка
+    try:
+        async with session.head(url, headers=headers, allow_redirects=True,
+                                timeout=aiohttp.ClientTimeout(total=15)) as resp:
+            if resp.status == 304 or resp.status >= 400:
+                return True
+            etag = resp.headers.get("ETag")
+            if etag and known.etag:
+                return etag == known.etag
+            if resp.content_length is not None and known.size is not None:
+                return resp.content_length == known.size
+            return True
+    except Exception:
+        return True
+
+
+def _state_path(part_path: Path) -> Path:
+    return part_path.with_name(part_path.name + ".json")
+
+
+def _drop_part(part_path: Path):
+    part_path.unlink(missing_ok=True)
+    _state_path(part_path).unlink(missing_ok=True)
+
+
+def _load_part_state(part_path: Path, url: str) -> dict | None:
     """
+    Состояние недокачанного файла: {"url", "etag", "last_modified"}. None — докачивать нечего.
+    Смещение — это просто размер .part на диске.
+    """
+    state_path = _state_path(part_path)
+    if not part_path.exists() or not state_path.exists():
+        return None
+    try:
+        state = json.loads(state_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return state if state.get("url") == url else None
 
-    async with sem:
+
+def _range_start(content_range: str | None) -> int | None:
+    """
+    Начало диапазона из "Content-Range: bytes 1000-1999/5000". None — заголовка нет или он не разбирается.
+    """
+    if not content_range:
+        return None
+    unit, _, spec = content_range.strip().partition(" ")
+    start, sep, _ = spec.partition("-")
+    if unit.lower() != "bytes" or not sep or not start.isdigit():
+        return None
+    return int(start)
+
+
+async def fetch_to_part(session, url: str, part_path: Path) -> tuple[str, int, str | None, str | None]:
+    """
+    Качает url в part_path, по возможности продолжая с места обрыва (Range + If-Range).
+    Докачка — только если у сохранённой части есть валидатор (ETag / Last-Modified): без If-Range
+    изменившийся на сервере файл склеился бы из двух версий. Ответ 206 принимается, только если
+    Content-Range начинается ровно с нашего смещения; 200 (Range не поддерживается, файл изменился)
+    или чужой диапазон — качаем с нуля.
+    Возвращает (sha256, размер, ETag, Last-Modified).
+    """
+    hasher = hashlib.sha256()
+    offset = 0
+    headers = {}
+
+    state = _load_part_state(part_path, url) if RESUMABLE_DOWNLOADS else None
+    validator = state and (state.get("etag") or state.get("last_modified"))
+    if validator:
+        # при докачке хеш считаем с начала файла
+        offset = await run_in_hash_pool(hash_file_into, part_path, hasher)
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+            headers["If-Range"] = validator
+
+    async with session.get(url, headers=headers, timeout=DOWNLOAD_TIMEOUT) as resp:
+        resp.raise_for_status()
+        etag = resp.headers.get("ETag")
+        last_modified = resp.headers.get("Last-Modified")
+
+        if offset and resp.status == 206 and _range_start(resp.headers.get("Content-Range")) == offset:
+            print(f"[ДОКАЧКА] ⏩ продолжаем с {offset:,} байт")
+        elif offset:
+            if resp.status == 206:
+                # диапазон не с того места — тело ответа не продолжение нашего файла:
+                # сохранённую часть выбрасываем, следующая попытка качает с нуля
+                await asyncio.to_thread(_drop_part, part_path)
+                raise aiohttp.ClientPayloadError(
+                    f"Content-Range {resp.headers.get('Content-Range')!r} не с {offset} байт — докачка с нуля"
+                )
+            hasher = hashlib.sha256()
+            offset = 0
+
+        if RESUMABLE_DOWNLOADS:
+            state = {"url": url, "etag": etag, "last_modified": last_modified}
+            await asyncio.to_thread(_state_path(part_path).write_text, json.dumps(state), encoding="utf-8")
+
+        # запись и SHA-256 куска — одним заходом в пул потоков (utils/hashing.py), event loop только читает сеть
+        size = offset
+        f = await run_in_hash_pool(open, part_path, "ab" if offset else "wb")
         try:
-            print(f"\n[{idx}] Файл: {file_name}")
+            async for chunk in resp.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                await run_in_hash_pool(write_and_hash, f, hasher, chunk)
+                size += len(chunk)
+        finally:
+            await run_in_hash_pool(f.close)
 
-            async with session.get(url, timeout=aiohttp.ClientTimeout(total=60)) as resp:
-                resp.raise_for_status()
-                data = await resp.read()
+    return hasher.hexdigest(), size, etag, last_modified
 
-            sha256 = hashlib.sha256(data).hexdigest()
 
-            if await file_hash_exists(db, sha256):
-                print(f"[ПРОПУЩЕНО] 🟡 Уже в базе | {sha256[:12]}…")
-                return "exists"
+def _is_retryable(e: Exception) -> bool:
+    if isinstance(e, aiohttp.ClientResponseError):
+        return e.status >= 500 or e.status in (408, 416, 429)
+    return isinstance(e, (aiohttp.ClientError, asyncio.TimeoutError, ConnectionError))
+
+
+async def download_single_file(session, registry: FileHashRegistry, sem, idx, file_name, url, save_dir, known=None,
+                               blob_root: Path | None = None):
+    """
+    Скачивает один файл потоково: куски по DOWNLOAD_CHUNK_SIZE пишутся во временный
+    {имя}.part и сразу же добавляются в SHA-256 (в пуле потоков HASH_WORKERS) —
+    в памяти не больше одного куска, event loop не занят хешированием.
+    Готовый файл уходит в content-addressed хранилище (utils/blob_store.py, один экземпляр
+    на весь диск), а в save_dir появляется ссылка на него {idx:03d}_{имя} — так документ
+    виден в папке каждого источника, где он встретился, хотя хранится один раз.
+    blob_root — корень хранилища (по умолчанию blob_root_for(save_dir), на одном томе с save_dir).
+    known — запись document_urls, если этот URL уже скачивался: тогда файл не качается, а в
+    save_dir создаётся ссылка на его блоб. Если блоба нет — файл качается как новый.
+    Новый ли это документ, решает registry (в памяти): из одинаковых файлов, скачанных
+    одновременно, новым считается только первый захвативший хеш.
+
+    Обрыв связи/таймаут/5xx — до DOWNLOAD_ATTEMPTS попыток с паузой, каждая продолжает
+    с места обрыва (fetch_to_part). Если попытки кончились, .part остаётся до следующего запуска.
 
-            extension = Path(file_name).suffix
-            stem = Path(file_name).stem
+    Возвращает:
+        "saved"     — новый документ сохранён
+        "exists"    — уже есть в базе (в save_dir — ссылка на имеющийся блоб)
+        "cached"    — URL уже скачивался раньше
+        "error"     — ошибка
+    """
+
+    extension = Path(file_name).suffix
+    stem = Path(file_name).stem
 
-            new_name = f"{idx:03d}_{stem}{extension}"
-            file_path = save_dir / new_name
+    new_name = f"{idx:03d}_{stem}{extension}"
+    file_path = save_dir / new_name
+    part_path = file_path.with_name(file_path.name + ".part")
+    if blob_root is None:
+        blob_root = blob_root_for(save_dir)
 
-            file_path.write_bytes(data)
+    async with sem:
+        try:
+            print(f"\n[{idx}] Файл: {file_name}")
 
-            await insert_file_hash(db, sha256)
+            if known is not None and (not VERIFY_KNOWN_URLS or await url_unchanged(session, url, known)):
+                blob = blob_path(known.hash, blob_root)
+                if await asyncio.to_thread(blob.exists):
+                    await asyncio.to_thread(link_view, blob, file_path)
+                    print(f"[ПРОПУЩЕНО] 🔵 URL уже скачивался | {known.hash[:12]}…")
+                    return "cached"
+                # скачан до хранилища блобов (дерево не переведено) или блоб потерян — качаем заново
+                print(f"[ХРАНИЛИЩЕ] URL уже скачивался, но блоба {known.hash[:12]}… нет — скачиваем")
+
+            attempt = 1
+            while True:
+                try:
+                    sha256, size, etag, last_modified = await fetch_to_part(session, url, part_path)
+                    break
+                except Exception as e:
+                    if not _is_retryable(e) or attempt >= DOWNLOAD_ATTEMPTS:
+                        raise
+                    if isinstance(e, aiohttp.ClientResponseError) and e.status == 416:
+                        _drop_part(part_path)  # сохранённая часть не подходит — с нуля
+                    delay = min(DOWNLOAD_RETRY_DELAY * 2 ** (attempt - 1), 60) + random.uniform(0, 1)
+                    done = part_path.stat().st_size if part_path.exists() else 0
+                    print(f"[ПОВТОР] {file_name}: {type(e).__name__} {e} | скачано {done:,} байт | "
+                          f"попытка {attempt + 1}/{DOWNLOAD_ATTEMPTS} через {delay:.1f} сек")
+                    await asyncio.sleep(delay)
+                    attempt += 1
+
+            _state_path(part_path).unlink(missing_ok=True)
+
+            blob, _ = await asyncio.to_thread(store_blob, part_path, sha256, blob_root)
+            await asyncio.to_thread(link_view, blob, file_path)
+
+            is_new = registry.add(bytes.fromhex(sha256))
+
+            # URL запоминается последним — когда файл уже в хранилище и виден в save_dir;
+            # иначе сбой выше навсегда превратил бы URL в «cached» без файла
+            await async_upsert_document_url(url, sha256, size, etag, last_modified)
+
+            if not is_new:
+                print(f"[ПРОПУЩЕНО] 🟡 Уже в базе, ссылка на хранилище | {new_name} → {sha256[:12]}…")
+                return "exists"
 
-            print(f"[СОХРАНЕНО] ✅ {new_name} | {len(data):,} байт | {sha256[:12]}…")
+            print(f"[СОХРАНЕНО] ✅ {new_name} | {size:,} байт | {sha256[:12]}…")
 
             return "saved"
 
         except Exception as e:
             print(f"[ОШИБКА] {file_name} → {url} | {e}")
+            if RESUMABLE_DOWNLOADS and _is_retryable(e) and part_path.exists():
+                print(f"[ДОКАЧКА] 💾 {part_path.name}: {part_path.stat().st_size:,} байт, продолжим при следующем запуске")
+            else:
+                _drop_part(part_path)
             return "error"
 
 
-async def download_files_from_html(
-    html_path: Path,
-    save_dir: Path | str = "downloads",
+def select_links(
+    candidates,
+    stats: dict,
     keywords: tuple[str, ...] = PASSPORT_KEYWORDS,
     stop_words: tuple[str, ...] = STOP_WORDS,
-    concurrent_limit: int = 10,
-):
+) -> list[tuple[str, str]]:
     """
-    Возвращает статистику обработки HTML файла.
+    Фильтр (название, url) по ключевым и стоп-словам. Заполняет счётчики stats.
+    Слова сравниваются через скомпилированные матчеры (utils/text_match.py).
     """
-
-    stats = {
-        "links_total": 0,
-        "filtered_no_keyword": 0,
-        "filtered_stop_word": 0,
-        "links_selected": 0,
-        "saved": 0,
-        "exists": 0,
-        "errors": 0,
-    }
-
-    save_dir = Path(save_dir)
-    save_dir.mkdir(parents=True, exist_ok=True)
-
-    print(f"\nОбработка: {html_path.name}")
-
-    html_content = html_path.read_text(encoding="utf-8", errors="replace")
-    soup = BeautifulSoup(html_content, "html.parser")
-
     all_links = []
+    keyword_matcher = matcher_for(tuple(keywords))
+    stop_matcher = matcher_for(tuple(stop_words))
 
-    for a in soup.find_all("a"):
+    for name, url in candidates:
 
         stats["links_total"] += 1
 
-        url = a.get("href")
-        name = (a.text or "").strip()
+        name = (name or "").strip()
 
         if not url or not name:
             stats["filtered_no_keyword"] += 1
             continue
 
-        name_lower = name.lower()
+        name_normalized = normalize_title(name)
 
-        if not any(kw.lower() in name_lower for kw in keywords):
+        if not keyword_matcher.search_normalized(name_normalized):
             stats["filtered_no_keyword"] += 1
             continue
 
-        if any(sw.lower() in name_lower for sw in stop_words):
+        if stop_matcher.search_normalized(name_normalized):
             stats["filtered_stop_word"] += 1
             print(f"[СТОП] {name}")
             continue
@@ -151,20 +326,52 @@ async def download_files_from_html(
 
     print(f"Найдено подходящих ссылок: {len(all_links)}")
 
+    return all_links
+
+
+def new_download_stats() -> dict:
+    return {
+        "links_total": 0,
+        "filtered_no_keyword": 0,
+        "filtered_stop_word": 0,
+        "links_selected": 0,
+        "saved": 0,
+        "exists": 0,
+        "cached": 0,
+        "errors": 0,
+    }
+
+
+async def download_links(all_links: list[tuple[str, str]], save_dir: Path, stats: dict, concurrent_limit: int = 10,
+                         blob_root: Path | None = None):
+    """
+    Параллельно скачивает отобранные ссылки в save_dir.
+    blob_root — корень хранилища блобов; по умолчанию — в корне загрузок save_dir (utils/blob_store.blob_root_for).
+    """
     if not all_links:
         return stats
 
+    if blob_root is None:
+        blob_root = blob_root_for(save_dir)
+
+    known = await async_document_urls_known(url for _, url in all_links)
+    if known:
+        print(f"Уже скачивались раньше (по URL): {len(known)}")
+
     sem = asyncio.Semaphore(concurrent_limit)
 
+    registry = await FileHashRegistry.load()
+
     async with aiohttp.ClientSession() as session:
-        async with AsyncSessionLocal() as db:
+        async with registry:
 
             tasks = []
 
             for idx, (file_name, url) in enumerate(all_links, 1):
                 tasks.append(
                     asyncio.create_task(
-                        download_single_file(session, db, sem, idx, file_name, url, save_dir)
+                        download_single_file(session, registry, sem, idx, file_name, url, save_dir, known.get(url),
+                                             blob_root)
                     )
                 )
 
@@ -178,12 +385,66 @@ async def download_files_from_html(
         elif r == "exists":
             stats["exists"] += 1
 
+        elif r == "cached":
+            stats["cached"] += 1
+
         elif r == "error":
             stats["errors"] += 1
 
     return stats
 
 
+async def download_files_from_html(
+    html_path: Path,
+    save_dir: Path | str = "downloads",
+    keywords: tuple[str, ...] = PASSPORT_KEYWORDS,
+    stop_words: tuple[str, ...] = STOP_WORDS,
+    concurrent_limit: int = 10,
+    blob_root: Path | str | None = None,
+):
+    """
+    Возвращает статистику обработки HTML файла.
+    """
+
+    stats = new_download_stats()
+
+    save_dir = Path(save_dir)
+    save_dir.mkdir(parents=True, exist_ok=True)
+
+    print(f"\nОбработка: {html_path.name}")
+
+    # потоковый разбор (utils/html_links.py) в отдельном потоке — чтение файла не держит event loop
+    all_links = await asyncio.to_thread(select_links, iter_links(html_path), stats, keywords, stop_words)
+
+    return await download_links(all_links, save_dir, stats, concurrent_limit, Path(blob_root) if blob_root else None)
+
+
+async def download_files_from_manifest(
+    manifest_path: Path,
+    save_dir: Path | str = "downloads",
+    keywords: tuple[str, ...] = PASSPORT_KEYWORDS,
+    stop_words: tuple[str, ...] = STOP_WORDS,
+    concurrent_limit: int = 10,
+    blob_root: Path | str | None = None,
+):
+    """
+    То же, что download_files_from_html, но ссылки берутся из JSONL/Parquet-манифеста
+    (utils/manifest.py) — без разбора HTML.
+    """
+
+    stats = new_download_stats()
+
+    save_dir = Path(save_dir)
+    save_dir.mkdir(parents=True, exist_ok=True)
+
+    print(f"\nОбработка: {manifest_path.name}")
+
+    candidates = ((doc.get("title"), doc.get("url")) for doc in read_manifest(manifest_path))
+    all_links = await asyncio.to_thread(select_links, candidates, stats, keywords, stop_words)
+
+    return await download_links(all_links, save_dir, stats, concurrent_limit, Path(blob_root) if blob_root else None)
+
+
 async def start_download(sources_ids: tuple[int, ...]):
     """
     Обрабатывает список источников.
@@ -194,15 +455,27 @@ async def start_download(sources_ids: tuple[int, ...]):
         src = SOURCES[filter_id]
         file_name = src['name']
 
-        html_file = Path("output_data") / f"{filter_id}. {file_name}.html"
+        html_file = Path(output_html_path(file_name, filter_id))
+        manifest_file = Path(output_manifest_path(file_name, filter_id))
         save_dir = Path("downloads") / f"{filter_id}. {file_name}"
 
         print(f"\n{'='*50}")
         print(f"Источник [{filter_id}]: {file_name}")
         print(f"{'='*50}")
 
-        stats = await download_files_from_html(
-            html_file,
+        # манифест есть у источников, собранных async_api_scraper; для старых — разбор HTML
+        if manifest_file.exists():
+            download = download_files_from_manifest
+            source_file = manifest_file
+        elif html_file.exists():
+            download = download_files_from_html
+            source_file = html_file
+        else:
+            print(f"⚠️  Нет ни {manifest_file}, ни {html_file} — скачивать нечего")
+            continue
+
+        stats = await download(
+            source_file,
             save_dir=save_dir,
             keywords=PASSPORT_KEYWORDS,
             stop_words=STOP_WORDS,
@@ -220,6 +493,7 @@ async def start_download(sources_ids: tuple[int, ...]):
                 f"Подходящих ссылок: {stats['links_selected']}\n\n"
                 f"Сохранено: {stats['saved']}\n"
                 f"Уже в базе: {stats['exists']}\n"
+                f"Пропущено по URL: {stats['cached']}\n"
                 f"Ошибки: {stats['errors']}"
             )
 
@@ -0,0 +1,111 @@
+# clients/http_pool.py
+import importlib.util
+import os
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from typing import Dict, Mapping, Optional
+
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Настройки пула (можно переопределить в .env)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 20))   # на один прокси
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", 10))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", 30))
+HTTP2 = os.getenv("HTTP2", "0") == "1"  # нужен пакет h2: pip install "httpx[http2]"
+
+
+def http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+class _NoStoragePolicy(DefaultCookiePolicy):
+    """
+    Клиенты пула общие для всех запросов, а куки у каждого запроса свои (случайный набор из
+    clients/data). Set-Cookie из ответов не сохраняем — иначе они подмешивались бы к чужим наборам.
+    """
+
+    def set_ok(self, cookie, request) -> bool:
+        return False
+
+
+def _cookie_jar() -> CookieJar:
+    return CookieJar(policy=_NoStoragePolicy())
+
+
+def with_cookies(headers: Optional[Mapping[str, str]], cookies: Optional[Mapping[str, str]]) -> Dict[str, str]:
+    """
+    Заголовки запроса с набором кук в виде заголовка Cookie — вместо устаревшего cookies=
+    на запрос, который в httpx смешивается с куками общего клиента.
+    """
+    merged = dict(headers or {})
+    if cookies:
+        merged["cookie"] = "; ".join(f"{name}={value}" for name, value in cookies.items())
+    return merged
+
+
+class HttpPool:
+    """
+    Общий пул HTTP-клиентов для обоих скраперов: по одному клиенту на прокси,
+    соединения (TCP+TLS) переиспользуются между detail/lots/search запросами.
+    Куки клиенты не хранят — их передают в каждом запросе заголовком (with_cookies).
+    """
+
+    def __init__(self, timeout: float = 15, max_connections: int = HTTP_MAX_CONNECTIONS,
+                 max_keepalive: int = HTTP_MAX_KEEPALIVE, keepalive_expiry: float = HTTP_KEEPALIVE_EXPIRY,
+                 http2: bool = HTTP2):
+        if http2 and not http2_available():
+            print("⚠️  [HTTP] HTTP2=1, но пакет h2 не установлен — работаем по HTTP/1.1")
+            http2 = False
+
+        self.timeout = timeout
+        self.http2 = http2
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._async_clients: Dict[Optional[str], httpx.AsyncClient] = {}
+        self._sync_clients: Dict[Optional[str], httpx.Client] = {}
+
+    def get_async(self, proxy: Optional[str] = None) -> httpx.AsyncClient:
+        client = self._async_clients.get(proxy)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                proxy=proxy,
+                timeout=self.timeout,
+                limits=self.limits,
+                http2=self.http2,
+                follow_redirects=True,
+                cookies=_cookie_jar(),
+            )
+            self._async_clients[proxy] = client
+        return client
+
+    def get_sync(self, proxy: Optional[str] = None) -> httpx.Client:
+        client = self._sync_clients.get(proxy)
+        if client is None or client.is_closed:
+            client = httpx.Client(
+                proxy=proxy,
+                timeout=self.timeout,
+                limits=self.limits,
+                http2=self.http2,
+                follow_redirects=True,
+                cookies=_cookie_jar(),
+            )
+            self._sync_clients[proxy] = client
+        return client
+
+    async def aclose(self):
+        for client in self._async_clients.values():
+            await client.aclose()
+        self._async_clients.clear()
+
+    def close(self):
+        for client in self._sync_clients.values():
+            client.close()
+        self._sync_clients.clear()
+
+
+http_pool = HttpPool()
@@ -0,0 +1,199 @@
+# clients/proxy_pool.py
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import httpx
+from dotenv import load_dotenv
+
+from utils.rate_limit import proxy_label
+
+load_dotenv()
+
+PROBE_URL = "https://api.ipify.org?format=json"
+PROBE_TIMEOUT = 10
+
+EWMA_ALPHA = 0.2              # вес последнего запроса в скользящих средних
+FAILS_TO_QUARANTINE = 3       # столько ошибок подряд — и прокси уходит в карантин
+ERROR_RATE_TO_QUARANTINE = 0.5
+QUARANTINE_BASE = 30.0        # сек, дальше удваивается при каждом повторном карантине
+QUARANTINE_MAX = 600.0
+HEALTH_CHECK_INTERVAL = 15.0
+LATENCY_PRIOR = 0.5           # сек — оценка задержки прокси, через который ещё не было ни одного запроса
+
+
+def load_proxies() -> List[str]:
+    raw = os.getenv("PROXIES", "")
+    proxies = [p.strip() for p in raw.split(",") if p.strip()]
+    if not proxies:
+        print("⚠️  [PROXY] Прокси не найдены в .env — работаем без прокси")
+    else:
+        print(f"✅ [PROXY] Загружено прокси: {len(proxies)} шт.")
+    return proxies
+
+
+@dataclass
+class ProxyHealth:
+    latency: float = 0.0          # EWMA, сек; 0 — ещё не пробовали (в score — оценка prior)
+    error_rate: float = 0.0       # EWMA доли ошибок (сеть, 5xx)
+    throttle_rate: float = 0.0    # EWMA доли 429
+    requests: int = 0
+    errors: int = 0
+    throttled: int = 0
+    fails_in_row: int = 0
+    in_flight: int = 0
+    quarantined_until: float = 0.0
+    quarantine_backoff: float = QUARANTINE_BASE
+
+    def score(self, prior: float = LATENCY_PRIOR) -> float:
+        """
+        Меньше — лучше: задержка, штрафы за ошибки/429 и текущая загрузка.
+        Без замеров задержка берётся равной prior — иначе нулевой score не рос бы с in_flight
+        и все одновременные acquire() достались бы одному ещё не опробованному прокси.
+        """
+        latency = self.latency or prior
+        return latency * (1 + 5 * self.error_rate + 3 * self.throttle_rate) * (1 + self.in_flight)
+
+
+class ProxyPool:
+    """
+    Пул прокси с оценкой здоровья: задержка, доля ошибок и 429 по каждому прокси.
+    acquire() на каждый запрос выдаёт лучший на данный момент прокси, плохие уходят
+    в карантин с экспоненциальной паузой и перепроверяются в фоне (run_health_checks).
+    Без прокси в .env пул содержит один «прямой» вариант — None.
+    """
+
+    def __init__(self, proxies: List[str]):
+        self.proxies: List[Optional[str]] = list(proxies) or [None]
+        self.health: Dict[Optional[str], ProxyHealth] = {p: ProxyHealth() for p in self.proxies}
+
+    def _available(self, now: float) -> List[Optional[str]]:
+        return [p for p in self.proxies if self.health[p].quarantined_until <= now]
+
+    def acquire(self) -> Optional[str]:
+        """
+        Лучший прокси для следующего запроса. Если все в карантине — тот, что выйдет раньше всех.
+        """
+        now = time.monotonic()
+        candidates = self._available(now) or [min(self.proxies, key=lambda p: self.health[p].quarantined_until)]
+        # неопробованные — наравне с лучшим из опробованных: их тоже попробуют, но по очереди
+        prior = min((self.health[p].latency for p in self.proxies if self.health[p].latency), default=LATENCY_PRIOR)
+        proxy = min(candidates, key=lambda p: self.health[p].score(prior))
+        self.health[proxy].in_flight += 1
+        return proxy
+
+    def report(self, proxy: Optional[str], latency: float, ok: bool, throttled: bool = False):
+        """
+        Результат запроса через прокси (вызывать ровно один раз на каждый acquire(); отменённый — cancel()).
+        """
+        h = self.health.get(proxy)
+        if h is None:
+            return
+        h.in_flight = max(0, h.in_flight - 1)
+        h.latency = latency if h.requests == 0 else h.latency + EWMA_ALPHA * (latency - h.latency)
+        h.requests += 1
+        h.throttle_rate += EWMA_ALPHA * (float(throttled) - h.throttle_rate)
+        h.error_rate += EWMA_ALPHA * (float(not ok) - h.error_rate)
+
+        if throttled:
+            h.throttled += 1
+        if ok:
+            h.fails_in_row = 0
+            if 0 < h.quarantined_until <= time.monotonic():
+                self.release(proxy)  # карантин истёк и прокси снова отвечает
+            return
+
+        h.errors += 1
+        h.fails_in_row += 1
+        if h.fails_in_row >= FAILS_TO_QUARANTINE or h.error_rate >= ERROR_RATE_TO_QUARANTINE:
+            self.quarantine(proxy, f"ошибок подряд: {h.fails_in_row}, доля ошибок: {h.error_rate:.0%}")
+
+    def cancel(self, proxy: Optional[str]):
+        """
+        Запрос через прокси отменён до результата: только освобождаем слот, без оценки.
+        """
+        h = self.health.get(proxy)
+        if h is not None:
+            h.in_flight = max(0, h.in_flight - 1)
+
+    def quarantine(self, proxy: Optional[str], reason: str = "не прошёл проверку"):
+        if len(self.proxies) == 1:
+            return  # единственный вариант — выключать нечего
+        h = self.health[proxy]
+        if h.quarantined_until > time.monotonic():
+            return
+        h.quarantined_until = time.monotonic() + h.quarantine_backoff
+        print(f"🟠 [PROXY] {proxy_label(proxy)} в карантине на {h.quarantine_backoff:.0f} сек ({reason})")
+        h.quarantine_backoff = min(h.quarantine_backoff * 2, QUARANTINE_MAX)
+
+    def release(self, proxy: Optional[str]):
+        h = self.health[proxy]
+        h.quarantined_until = 0.0
+        h.quarantine_backoff = QUARANTINE_BASE
+        h.fails_in_row = 0
+        h.error_rate = 0.0
+
+    # ─── Проверка здоровья ────────────────────────────────────────────────────
+
+    async def probe(self, proxy: Optional[str]) -> Optional[str]:
+        """
+        Запрос к PROBE_URL через прокси. Возвращает внешний IP или None.
+        """
+        t0 = time.monotonic()
+        try:
+            async with httpx.AsyncClient(proxy=proxy, timeout=PROBE_TIMEOUT) as client:
+                r = await client.get(PROBE_URL)
+            r.raise_for_status()
+            ip = r.json().get("ip", "?")
+        except Exception as e:
+            print(f"[FAIL] {proxy_label(proxy)} → {type(e).__name__}: {e}")
+            return None
+        self.health[proxy].latency = time.monotonic() - t0
+        return ip
+
+    async def check_all(self) -> Dict[Optional[str], Optional[str]]:
+        """
+        Параллельно проверяет все прокси, нерабочие отправляет в карантин.
+        """
+        results = await asyncio.gather(*(self.probe(p) for p in self.proxies))
+        report = dict(zip(self.proxies, results))
+        for proxy, ip in report.items():
+            if ip is None:
+                self.quarantine(proxy)
+            else:
+                self.release(proxy)
+        return report
+
+    async def run_health_checks(self, interval: float = HEALTH_CHECK_INTERVAL):
+        """
+        Фоновая задача: прокси, у которых истёк карантин, перепроверяются параллельно.
+        Прошедшие проверку возвращаются в работу, остальные — обратно в карантин с большей паузой.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            due = [p for p in self.proxies
+                   if 0 < self.health[p].quarantined_until <= now]
+            if not due:
+                continue
+            results = await asyncio.gather(*(self.probe(p) for p in due))
+            for proxy, ip in zip(due, results):
+                if ip is None:
+                    self.quarantine(proxy)
+                else:
+                    print(f"🟢 [PROXY] {proxy_label(proxy)} снова в работе")
+                    self.release(proxy)
+
+    def summary(self) -> str:
+        now = time.monotonic()
+        lines = []
+        for proxy in sorted(self.proxies, key=lambda p: self.health[p].score()):
+            h = self.health[proxy]
+            state = "карантин" if h.quarantined_until > now else "ок"
+            lines.append(
+                f"{proxy_label(proxy):<30} {state:<8} | {h.latency * 1000:>6.0f} мс | "
+                f"запросов: {h.requests:>6} | ошибок: {h.errors:>4} | 429: {h.throttled:>4}"
+            )
+        return "\n".join(lines)
@@ -2,6 +2,10 @@
 import os
 from pathlib import Path
 
+from dotenv import load_dotenv
+
+load_dotenv()
+
 
 class Settings:
     BASE_DIR: Path = Path(__file__).resolve().parent.parent
@@ -20,6 +24,10 @@ class Settings:
     else:
         DATABASE_URL: str = f"sqlite:///{BASE_DIR / 'database.core'}"
 
+    # Профиль PRAGMA для SQLite (см. db/core/engine.py: SQLITE_PROFILES)
+    # default — как было, safe — WAL + synchronous=FULL, fast — WAL + NORMAL + кеш/mmap, bulk — для разовых заливок
+    SQLITE_PROFILE: str = os.getenv("SQLITE_PROFILE", "fast").lower()
+
 
 
 
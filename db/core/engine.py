@@ -1,23 +1,93 @@
 # engine.py
 from pathlib import Path
-from sqlalchemy import create_engine
-from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from db.config.settings import settings
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 DB_PATH = BASE_DIR / "data" / "db.sqlite"
 
+
+# ────────────────────────────────────────────────
+# Профили PRAGMA (применяются на каждое новое соединение)
+# ────────────────────────────────────────────────
+
+SQLITE_PROFILES: dict[str, dict[str, str | int]] = {
+    # поведение SQLite по умолчанию: rollback-journal, fsync на каждый commit
+    "default": {},
+    # WAL: читатели не блокируют писателя; FULL — fsync на каждый commit
+    "safe": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "busy_timeout": 5000,
+    },
+    # WAL + NORMAL: fsync только на checkpoint, при сбое питания можно потерять последние commit-ы, но не целостность
+    "fast": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -65536,      # 64 МБ
+        "mmap_size": 268435456,    # 256 МБ
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+    # разовые заливки/бэкфилл: без fsync вообще
+    "bulk": {
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "cache_size": -262144,     # 256 МБ
+        "mmap_size": 1073741824,   # 1 ГБ
+        "temp_store": "MEMORY",
+        "busy_timeout": 10000,
+    },
+}
+
+
+def apply_sqlite_profile(engine: Engine, profile: str) -> None:
+    """
+    Вешает на engine обработчик connect, который выставляет PRAGMA выбранного профиля.
+    Для async engine передавать async_engine.sync_engine.
+    """
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"Неизвестный SQLITE_PROFILE={profile!r}, доступны: {', '.join(SQLITE_PROFILES)}")
+
+    pragmas = SQLITE_PROFILES[profile]
+    if not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def make_engine(url: str, profile: str = settings.SQLITE_PROFILE) -> Engine:
+    sync_engine = create_engine(
+        url,
+        echo=False,
+        connect_args={"check_same_thread": False}
+    )
+    apply_sqlite_profile(sync_engine, profile)
+    return sync_engine
+
+
+def make_async_engine(url: str, profile: str = settings.SQLITE_PROFILE) -> AsyncEngine:
+    aengine = create_async_engine(
+        url,
+        echo=False,
+        future=True
+    )
+    apply_sqlite_profile(aengine.sync_engine, profile)
+    return aengine
+
+
 # sync engine для миграций
 DATABASE_URL = f"sqlite:///{DB_PATH}"
-engine = create_engine(
-    DATABASE_URL,
-    echo=False,
-    connect_args={"check_same_thread": False}
-)
+engine = make_engine(DATABASE_URL)
 
 # async engine для скриптов
 ASYNC_DATABASE_URL = f"sqlite+aiosqlite:///{DB_PATH}"
-async_engine = create_async_engine(
-    ASYNC_DATABASE_URL,
-    echo=False,
-    future=True
-)
\ No newline at end of file
+async_engine = make_async_engine(ASYNC_DATABASE_URL)
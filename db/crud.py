@@ -1,16 +1,31 @@
 # crud.py
 
-from sqlalchemy import select, insert
+from datetime import datetime
+from typing import Iterable, Mapping, Optional
+
+from sqlalchemy import case, func, select, insert
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from .core.session import SyncSessionLocal
 from .core.session import AsyncSessionLocal
-from db.models.file_hash import FileHash, Tender
+from db.models.file_hash import DocumentUrl, FileHash, SourceCheckpoint, Tender
 
 
 # -------------------------
 # Tender
 # -------------------------
+
+# SQLite ограничивает кол-во параметров в одном запросе — IN (...) режем на куски
+IN_CHUNK_SIZE = 500
+
+
+def _chunks(ids: list[str], size: int = IN_CHUNK_SIZE):
+    for i in range(0, len(ids), size):
+        yield ids[i:i + size]
+
+
 def sync_tender_exists(tender_id: str) -> bool:
     """
     Проверяет, есть ли tender с данным tender_id в базе.
@@ -25,6 +40,25 @@ def sync_tender_exists(tender_id: str) -> bool:
         return False
 
 
+def sync_tenders_existing(tender_ids: Iterable[str]) -> set[str]:
+    """
+    Пакетная проверка: возвращает те tender_id из списка, что уже есть в базе.
+    Одна сессия и один SELECT ... IN на страницу поиска. При ошибке — пустой set.
+    """
+    ids = list(dict.fromkeys(tender_ids))
+    if not ids:
+        return set()
+    try:
+        found = set()
+        with SyncSessionLocal() as session:
+            for chunk in _chunks(ids):
+                stmt = select(Tender.tender_id).where(Tender.tender_id.in_(chunk))
+                found.update(session.execute(stmt).scalars())
+        return found
+    except SQLAlchemyError:
+        return set()
+
+
 def sync_insert_tender_to_db(tender_id: str) -> bool:
     """
     Добавляет новый tender с tender_id в базу.
@@ -54,6 +88,24 @@ async def async_tender_exists(tender_id: str) -> bool:
         return False
 
 
+async def async_tenders_existing(tender_ids: Iterable[str]) -> set[str]:
+    """
+    Async-версия sync_tenders_existing: один SELECT ... IN вместо сессии на каждый ID.
+    """
+    ids = list(dict.fromkeys(tender_ids))
+    if not ids:
+        return set()
+    try:
+        found = set()
+        async with AsyncSessionLocal() as session:
+            for chunk in _chunks(ids):
+                stmt = select(Tender.tender_id).where(Tender.tender_id.in_(chunk))
+                found.update((await session.execute(stmt)).scalars())
+        return found
+    except SQLAlchemyError:
+        return set()
+
+
 async def async_insert_tender_to_db(tender_id: str) -> bool:
     try:
         async with AsyncSessionLocal() as session:
@@ -68,13 +120,132 @@ async def async_insert_tender_to_db(tender_id: str) -> bool:
         return False
 
 
+async def async_insert_tenders_bulk(tender_ids: Iterable[str]) -> int | None:
+    """
+    Вставляет пачку tender_id одной транзакцией, дубликаты тихо пропускаются
+    (INSERT OR IGNORE в SQLite, ON CONFLICT DO NOTHING в Postgres).
+    Возвращает:
+        int   — сколько строк реально вставлено
+        None  — ошибка, ничего не записано
+    """
+    ids = list(dict.fromkeys(tender_ids))
+    if not ids:
+        return 0
+    try:
+        async with AsyncSessionLocal() as session:
+            if session.get_bind().dialect.name == "postgresql":
+                stmt = pg_insert(Tender).on_conflict_do_nothing(index_elements=["tender_id"])
+            else:
+                stmt = insert(Tender).prefix_with("OR IGNORE")
+
+            inserted = 0
+            for chunk in _chunks(ids):
+                result = await session.execute(stmt.values([{"tender_id": t} for t in chunk]))
+                inserted += max(result.rowcount, 0)
+            await session.commit()
+            return inserted
+    except SQLAlchemyError:
+        return None
+
+
+async def async_upsert_tenders_bulk(tenders: Mapping[str, Optional[datetime]]) -> int | None:
+    """
+    Как async_insert_tenders_bulk, но с dateModified: {tender_id: date_modified}.
+    Уже записанному тендеру обновляется date_modified (если новая дата известна) —
+    так повторно обработанный изменённый тендер не будет считаться изменённым снова.
+    Возвращает кол-во вставленных/обновлённых строк или None при ошибке.
+    """
+    if not tenders:
+        return 0
+    rows = [{"tender_id": t, "date_modified": dm} for t, dm in tenders.items()]
+    try:
+        async with AsyncSessionLocal() as session:
+            dialect_insert = pg_insert if session.get_bind().dialect.name == "postgresql" else sqlite_insert
+            stmt = dialect_insert(Tender)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["tender_id"],
+                set_={"date_modified": func.coalesce(stmt.excluded.date_modified, Tender.date_modified)},
+            )
+
+            affected = 0
+            for i in range(0, len(rows), IN_CHUNK_SIZE // 2):
+                result = await session.execute(stmt.values(rows[i:i + IN_CHUNK_SIZE // 2]))
+                affected += max(result.rowcount, 0)
+            await session.commit()
+            return affected
+    except SQLAlchemyError:
+        return None
+
+
+async def async_tenders_modified(tender_ids: Iterable[str]) -> dict[str, Optional[datetime]]:
+    """
+    {tender_id: date_modified} для тех ID, что уже есть в базе. При ошибке — пустой dict.
+    """
+    ids = list(dict.fromkeys(tender_ids))
+    if not ids:
+        return {}
+    try:
+        found = {}
+        async with AsyncSessionLocal() as session:
+            for chunk in _chunks(ids):
+                stmt = select(Tender.tender_id, Tender.date_modified).where(Tender.tender_id.in_(chunk))
+                found.update((await session.execute(stmt)).tuples().all())
+        return found
+    except SQLAlchemyError:
+        return {}
+
+
+# -------------------------
+# SourceCheckpoint
+# -------------------------
+
+async def async_get_source_checkpoint(source_idx: int) -> SourceCheckpoint | None:
+    try:
+        async with AsyncSessionLocal() as session:
+            stmt = select(SourceCheckpoint).where(SourceCheckpoint.source_idx == source_idx)
+            return (await session.execute(stmt)).scalar_one_or_none()
+    except SQLAlchemyError:
+        return None
+
+
+async def async_save_source_checkpoint(source_idx: int, last_crawl_at: datetime,
+                                       max_date_modified: datetime | None) -> bool:
+    """
+    Записывает чекпоинт источника. max_date_modified не уменьшается: если в этом проходе
+    ничего нового не было (None или дата старее), остаётся прежний.
+    """
+    values = {"source_idx": source_idx, "last_crawl_at": last_crawl_at, "max_date_modified": max_date_modified}
+    try:
+        async with AsyncSessionLocal() as session:
+            dialect_insert = pg_insert if session.get_bind().dialect.name == "postgresql" else sqlite_insert
+            stmt = dialect_insert(SourceCheckpoint).values(**values)
+            previous = SourceCheckpoint.max_date_modified
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["source_idx"],
+                set_={
+                    "last_crawl_at": stmt.excluded.last_crawl_at,
+                    "max_date_modified": case(
+                        (previous.is_(None), stmt.excluded.max_date_modified),
+                        (stmt.excluded.max_date_modified > previous, stmt.excluded.max_date_modified),
+                        else_=previous,
+                    ),
+                    "updated_at": func.now(),
+                },
+            )
+            await session.execute(stmt)
+            await session.commit()
+            return True
+    except SQLAlchemyError:
+        return False
+
+
 # -------------------------
 # FileHash
 # -------------------------
 
-async def insert_file_hash(session: AsyncSession, hash_value: str) -> bool | None:
+async def insert_file_hash(session: AsyncSession, hash_value: bytes) -> bool | None:
     """
-    Вставляет хеш файла.
+    Вставляет хеш файла (32 байта SHA-256 digest).
     Возвращает:
         True  — если реально вставлен
         None  — если вставка не произошла (дубликат или ошибка)
@@ -95,10 +266,88 @@ async def insert_file_hash(session: AsyncSession, hash_value: str) -> bool | Non
         return None
 
 
-async def file_hash_exists(session: AsyncSession, hash_value: str) -> bool:
+async def async_insert_file_hashes_bulk(hash_values: Iterable[bytes]) -> int | None:
+    """
+    Вставляет пачку хешей (32 байта SHA-256 digest) одной транзакцией, дубликаты тихо пропускаются.
+    Возвращает:
+        int   — сколько строк реально вставлено
+        None  — ошибка, ничего не записано
+    """
+    hashes = list(dict.fromkeys(hash_values))
+    if not hashes:
+        return 0
+    try:
+        async with AsyncSessionLocal() as session:
+            if session.get_bind().dialect.name == "postgresql":
+                stmt = pg_insert(FileHash).on_conflict_do_nothing(index_elements=["hash"])
+            else:
+                stmt = insert(FileHash).prefix_with("OR IGNORE")
+
+            inserted = 0
+            for chunk in _chunks(hashes):
+                result = await session.execute(stmt.values([{"hash": h} for h in chunk]))
+                inserted += max(result.rowcount, 0)
+            await session.commit()
+            return inserted
+    except SQLAlchemyError:
+        return None
+
+
+async def file_hash_exists(session: AsyncSession, hash_value: bytes) -> bool:
     """
     Быстрая проверка существования хеша.
     """
     stmt = select(FileHash.id).where(FileHash.hash == hash_value).limit(1)
     result = await session.execute(stmt)
-    return result.scalar_one_or_none() is not None
\ No newline at end of file
+    return result.scalar_one_or_none() is not None
+
+
+# -------------------------
+# DocumentUrl
+# -------------------------
+
+async def async_document_urls_known(urls: Iterable[str]) -> dict[str, DocumentUrl]:
+    """
+    Какие из URL уже скачивались: {url: DocumentUrl}. Запросы пачками по IN_CHUNK_SIZE.
+    При ошибке БД — пустой dict (всё скачается заново, дубликаты отсеет хеш).
+    """
+    urls = list(dict.fromkeys(urls))
+    if not urls:
+        return {}
+    found: dict[str, DocumentUrl] = {}
+    try:
+        async with AsyncSessionLocal() as session:
+            for chunk in _chunks(urls):
+                stmt = select(DocumentUrl).where(DocumentUrl.url.in_(chunk))
+                for row in (await session.execute(stmt)).scalars():
+                    found[row.url] = row
+        return found
+    except SQLAlchemyError:
+        return {}
+
+
+async def async_upsert_document_url(url: str, hash_value: str, size: int | None = None,
+                                    etag: str | None = None, last_modified: str | None = None) -> bool:
+    """
+    Запоминает (или обновляет) URL → хеш/размер/ETag после скачивания.
+    """
+    values = {"url": url, "hash": hash_value, "size": size, "etag": etag, "last_modified": last_modified}
+    try:
+        async with AsyncSessionLocal() as session:
+            dialect_insert = pg_insert if session.get_bind().dialect.name == "postgresql" else sqlite_insert
+            stmt = dialect_insert(DocumentUrl).values(**values)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["url"],
+                set_={
+                    "hash": stmt.excluded.hash,
+                    "size": stmt.excluded.size,
+                    "etag": stmt.excluded.etag,
+                    "last_modified": stmt.excluded.last_modified,
+                    "checked_at": func.now(),
+                },
+            )
+            await session.execute(stmt)
+            await session.commit()
+            return True
+    except SQLAlchemyError:
+        return False
\ No newline at end of file
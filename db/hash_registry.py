@@ -0,0 +1,63 @@
+# db/hash_registry.py
+from typing import Iterable
+
+from sqlalchemy import select
+
+from .core.session import AsyncSessionLocal
+from db.crud import async_insert_file_hashes_bulk
+from db.models.file_hash import FileHash
+from utils.write_behind import WriteBehindBuffer
+
+
+class FileHashRegistry(WriteBehindBuffer[bytes]):
+    """
+    Реестр хешей скачанных файлов — замена file_hash_exists / insert_file_hash на каждый файл.
+
+    Проверка «уже есть?» отвечается из памяти: set 32-байтных digest загружается из
+    file_hashes один раз. Новые хеши пишет в базу единственная фоновая задача — пачками,
+    одной транзакцией каждые batch_size хешей или раз в flush_interval сек (utils/write_behind.py).
+    Загрузчики к базе за хешами не ходят вообще.
+
+    add() атомарен (нет await между проверкой и добавлением): из двух одинаковых файлов,
+    скачанных одновременно, новым будет считаться только первый.
+    Использовать как async-контекст: при выходе очередь гарантированно сбрасывается в базу.
+    """
+
+    def __init__(self, hashes: Iterable[bytes] = (), batch_size: int = 200, flush_interval: float = 5.0):
+        super().__init__(async_insert_file_hashes_bulk, "file_hashes", batch_size, flush_interval)
+        self._known: set[bytes] = set(hashes)
+
+    @classmethod
+    async def load(cls, batch_size: int = 200, flush_interval: float = 5.0,
+                   read_batch: int = 50_000) -> "FileHashRegistry":
+        """
+        Строит реестр из таблицы file_hashes одним потоковым SELECT.
+        """
+        registry = cls(batch_size=batch_size, flush_interval=flush_interval)
+        async with AsyncSessionLocal() as session:
+            stmt = select(FileHash.hash).execution_options(yield_per=read_batch)
+            result = await session.stream_scalars(stmt)
+            async for hash_value in result:
+                registry._known.add(hash_value)
+        print(f"[HASHES] Загружено хешей файлов: {len(registry):,}")
+        return registry
+
+    def _describe(self, digest: bytes) -> str:
+        return digest.hex()[:12]
+
+    def __contains__(self, digest: bytes) -> bool:
+        return digest in self._known
+
+    def __len__(self) -> int:
+        return len(self._known)
+
+    def add(self, digest: bytes) -> bool:
+        """
+        Файл уже лежит в хранилище: хеш становится известным и, если он новый, ставится
+        в очередь на запись в базу. True — такого файла раньше не было.
+        """
+        if digest in self._known:
+            return False
+        self._known.add(digest)
+        self._push(digest)
+        return True
@@ -1,6 +1,10 @@
 #file_hash
-from sqlalchemy import String
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import BigInteger, DateTime, Integer, LargeBinary, String
 from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
 
 from db.core.base import Base
 
@@ -10,13 +14,20 @@ class FileHash(Base):
 
     id: Mapped[int] = mapped_column(primary_key=True)
 
-    hash: Mapped[str] = mapped_column(
-        String(64),  # SHA-256 hex
+    # 32 байта SHA-256 digest (вдвое меньше hex-строки — и таблица, и индекс)
+    hash: Mapped[bytes] = mapped_column(
+        LargeBinary(32),
         unique=True,
         nullable=False,
         index=True
     )
 
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        server_default=func.now(),
+        nullable=False
+    )
+
 
 class Tender(Base):
     __tablename__ = "tenders"
@@ -30,30 +41,60 @@ class Tender(Base):
         index=True
     )
 
+    # dateModified тендера на момент обработки (UTC) — по нему изменённые тендеры обрабатываются повторно
+    date_modified: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+
+class SourceCheckpoint(Base):
+    """
+    Точка инкрементального обхода источника из SOURCES: всё, что изменено до max_date_modified,
+    уже собрано. Обновляется только после успешного полного прохода источника.
+    """
+    __tablename__ = "source_checkpoints"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+
+    source_idx: Mapped[int] = mapped_column(
+        Integer,
+        unique=True,
+        nullable=False,
+        index=True
+    )
+
+    last_crawl_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)  # старт прохода, UTC
+    max_date_modified: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)  # UTC
+
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False
+    )
+
+
+class DocumentUrl(Base):
+    """
+    Уже скачанные URL документов: по ним загрузчик пропускает файл ещё до скачивания.
+    """
+    __tablename__ = "document_urls"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+
+    url: Mapped[str] = mapped_column(
+        String(2048),
+        unique=True,
+        nullable=False,
+        index=True
+    )
+
+    hash: Mapped[str] = mapped_column(String(64), nullable=False)  # SHA-256 hex содержимого
+    size: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
+    etag: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    last_modified: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+
+    checked_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        server_default=func.now(),
+        nullable=False
+    )
 
-# бинарное хранение (рекомендую)
-# from sqlalchemy.orm import Mapped, mapped_column
-# from sqlalchemy import LargeBinary
-# from typing import Optional
-# from datetime import datetime
-# from sqlalchemy import DateTime
-# from sqlalchemy.sql import func
-#
-# class FileHash(Base):
-#     __tablename__ = "file_hashes"
-#
-#     id: Mapped[int] = mapped_column(primary_key=True)
-#
-#     # 32 байта для SHA-256
-#     hash: Mapped[bytes] = mapped_column(
-#         LargeBinary(32),
-#         unique=True,
-#         nullable=False,
-#         index=True
-#     )
-#
-#     created_at: Mapped[datetime] = mapped_column(
-#         DateTime,
-#         server_default=func.now(),
-#         nullable=False
-#     )
\ No newline at end of file
@@ -0,0 +1,75 @@
+# db/tender_index.py
+import hashlib
+from array import array
+from bisect import bisect_left
+from typing import Iterable
+
+from sqlalchemy import select
+
+from .core.session import AsyncSessionLocal
+from db.models.file_hash import Tender
+
+
+# сколько новых ключей копим в set, прежде чем влить их в отсортированный массив
+MERGE_THRESHOLD = 100_000
+
+
+def tender_key(tender_id: str) -> int:
+    """
+    64-битный ключ тендера (blake2b). Вероятность коллизии при 10 млн ID ~ 5e-13.
+    """
+    return int.from_bytes(hashlib.blake2b(tender_id.encode(), digest_size=8).digest(), "big")
+
+
+class SeenTenderIndex:
+    """
+    Индекс уже обработанных тендеров в памяти — замена async_tender_exists на каждый ID.
+
+    Загружается один раз из таблицы tenders и дальше пополняется воркерами через add().
+    Хранит не строки, а 64-битные ключи в отсортированном array('Q') — 8 байт на тендер
+    (10 млн тендеров ≈ 80 МБ). Свежие ключи сначала попадают в set и периодически
+    вливаются в массив.
+    """
+
+    def __init__(self, tender_ids: Iterable[str] = ()):
+        self._sorted = array("Q", sorted({tender_key(t) for t in tender_ids}))
+        self._recent: set[int] = set()
+
+    @classmethod
+    async def load(cls, batch_size: int = 50_000) -> "SeenTenderIndex":
+        """
+        Строит индекс из таблицы tenders одним потоковым SELECT.
+        """
+        keys = array("Q")
+        async with AsyncSessionLocal() as session:
+            stmt = select(Tender.tender_id).execution_options(yield_per=batch_size)
+            result = await session.stream_scalars(stmt)
+            async for tender_id in result:
+                keys.append(tender_key(tender_id))
+
+        index = cls()
+        index._sorted = array("Q", sorted(set(keys)))
+        print(f"[INDEX] Загружено тендеров в индекс: {len(index):,}")
+        return index
+
+    def __contains__(self, tender_id: str) -> bool:
+        key = tender_key(tender_id)
+        if key in self._recent:
+            return True
+        pos = bisect_left(self._sorted, key)
+        return pos < len(self._sorted) and self._sorted[pos] == key
+
+    def __len__(self) -> int:
+        return len(self._sorted) + len(self._recent)
+
+    def add(self, tender_id: str) -> None:
+        if tender_id in self:
+            return
+        self._recent.add(tender_key(tender_id))
+        if len(self._recent) >= MERGE_THRESHOLD:
+            self._merge()
+
+    def _merge(self) -> None:
+        merged = sorted(self._recent.union(self._sorted))
+        self._sorted = array("Q", merged)
+        self._recent.clear()
@@ -0,0 +1,42 @@
+# db/tender_writer.py
+from datetime import datetime
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from db.crud import async_upsert_tenders_bulk
+from db.tender_index import SeenTenderIndex
+from utils.write_behind import WriteBehindBuffer
+
+
+class TenderWriteBuffer(WriteBehindBuffer[Tuple[str, Optional[datetime]]]):
+    """
+    Write-behind буфер обработанных тендеров (utils/write_behind.py).
+
+    Воркеры кладут tender_id (и его dateModified) через add(), а запись в tenders идёт пачками одной
+    транзакцией — каждые batch_size ID или раз в flush_interval сек.
+    Использовать как async-контекст: при выходе (в т.ч. по исключению) буфер
+    гарантированно сбрасывается в базу.
+    """
+
+    def __init__(self, batch_size: int = 200, flush_interval: float = 5.0,
+                 seen_index: Optional[SeenTenderIndex] = None,
+                 on_flushed: Optional[Callable[[Iterable[str]], None]] = None):
+        super().__init__(self._write, "tenders", batch_size, flush_interval)
+        self.seen_index = seen_index
+        self.on_flushed = on_flushed  # вызывается с ID каждой записанной пачки (журнал работы)
+
+    @staticmethod
+    async def _write(batch: List[Tuple[str, Optional[datetime]]]) -> Optional[int]:
+        # повторный add того же ID — побеждает последний dateModified
+        return await async_upsert_tenders_bulk(dict(batch))
+
+    def _describe(self, item: Tuple[str, Optional[datetime]]) -> str:
+        return item[0]
+
+    async def add(self, tender_id: str, date_modified: Optional[datetime] = None):
+        if self.seen_index is not None:
+            self.seen_index.add(tender_id)
+        self._push((tender_id, date_modified))
+
+    async def _on_flushed(self, batch: List[Tuple[str, Optional[datetime]]]):
+        if self.on_flushed is not None:
+            self.on_flushed([tender_id for tender_id, _ in batch])
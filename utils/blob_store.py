@@ -0,0 +1,108 @@
+import os
+import shutil
+import uuid
+from pathlib import Path
+
+# Content-addressed хранилище: каждый уникальный документ лежит на диске один раз под именем
+# своего SHA-256 (downloads/.blobs/ab/cd/abcd…), а папки источников — это «витрины» из
+# жёстких (или символических) ссылок на блобы. Хранилище — в корне загрузок рядом с папками
+# источников, чтобы жёсткие ссылки работали (они возможны только в пределах одной файловой системы).
+BLOB_DIR = ".blobs"
+BLOB_ROOT = Path("downloads") / BLOB_DIR
+BLOB_LINK_MODE = "hardlink"  # "hardlink" | "symlink"
+
+
+def blob_root_for(save_dir: Path) -> Path:
+    """
+    Хранилище для папки источника save_dir — в корне загрузок, которому она принадлежит
+    (downloads/<источник> → downloads/.blobs). Если save_dir — отдельно смонтированный том,
+    хранилище внутри неё: блобы и ссылки на них всегда на одной файловой системе.
+    """
+    save_dir = Path(save_dir)
+    if os.path.ismount(save_dir):
+        return save_dir / BLOB_DIR
+    return save_dir.parent / BLOB_DIR
+
+
+def blob_path(sha256: str, root: Path = BLOB_ROOT) -> Path:
+    return root / sha256[:2] / sha256[2:4] / sha256
+
+
+def store_blob(src: Path, sha256: str, root: Path = BLOB_ROOT) -> tuple[Path, bool]:
+    """
+    Кладёт файл src в хранилище под его хешем и удаляет src.
+    Возвращает (путь блоба, True — блоб новый / False — такой уже был).
+    Атомарно: из двух одновременных одинаковых файлов блобом станет ровно один.
+    """
+    blob = blob_path(sha256, root)
+    blob.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.link(src, blob)
+        created = True
+    except FileExistsError:
+        created = False
+    except OSError:
+        # жёсткие ссылки не поддерживаются (FAT, лимит ссылок, другой том) — переносим:
+        # сначала во временное имя рядом с блобом (копированием, если том другой), затем атомарно
+        if blob.exists():
+            created = False
+        else:
+            tmp = blob.with_name(f".{blob.name}.{uuid.uuid4().hex[:8]}.tmp")
+            shutil.move(src, tmp)
+            os.replace(tmp, blob)
+            return blob, True
+    os.unlink(src)
+    return blob, created
+
+
+def link_view(blob: Path, view: Path, mode: str = BLOB_LINK_MODE) -> Path:
+    """
+    Создаёт (или заменяет) файл витрины view, указывающий на блоб.
+    Если view уже этот же файл — ничего не делает. Замена атомарная: через временное имя + replace.
+    Жёсткая ссылка невозможна (другой том, FAT, лимит ссылок) — откат на symlink.
+    """
+    if view.exists() and os.path.samefile(view, blob):
+        return view
+
+    view.parent.mkdir(parents=True, exist_ok=True)
+    tmp = view.with_name(f".{view.name}.{uuid.uuid4().hex[:8]}.link")
+    if mode == "hardlink":
+        try:
+            os.link(blob, tmp)
+        except OSError:
+            mode = "symlink"
+    if mode == "symlink":
+        os.symlink(os.path.relpath(blob, view.parent), tmp)
+    os.replace(tmp, view)
+    return view
+
+
+def adopt_file(path: Path, sha256: str, root: Path = BLOB_ROOT, mode: str = BLOB_LINK_MODE) -> str:
+    """
+    Уже лежащий в папке источника файл переводит в хранилище: файл становится ссылкой на блоб.
+    Возвращает:
+        "new"     — блоб создан из этого файла
+        "linked"  — файл был дубликатом и заменён ссылкой на имеющийся блоб
+        "already" — файл уже ссылка на свой блоб
+    """
+    blob = blob_path(sha256, root)
+    if blob.exists():
+        if os.path.samefile(path, blob):
+            return "already"
+        link_view(blob, path, mode)
+        return "linked"
+
+    blob.parent.mkdir(parents=True, exist_ok=True)
+    if mode == "hardlink":
+        try:
+            os.link(path, blob)
+            return "new"
+        except FileExistsError:
+            link_view(blob, path, mode)
+            return "linked"
+        except OSError:
+            pass
+    # symlink-режим или жёсткие ссылки недоступны: блоб забирает файл, на его месте — symlink
+    os.replace(path, blob)
+    link_view(blob, path, "symlink")
+    return "new"
@@ -1,56 +1,90 @@
 
 import os
 
-def save_files_as_html(tender_id: str, files: list, base_name: str, source_idx: int):
+OUTPUT_FOLDER = "output_data"
+
+
+def output_html_path(base_name: str, source_idx: int) -> str:
+    file_name = f'{source_idx}. {base_name}'
+    if not file_name.lower().endswith('.html'):
+        file_name += '.html'
+    return os.path.join(OUTPUT_FOLDER, file_name)
+
+
+def output_manifest_path(base_name: str, source_idx: int) -> str:
+    """
+    JSONL-манифест документов рядом с HTML: output_data/{idx}. {name}.jsonl
+    """
+    return os.path.join(OUTPUT_FOLDER, f'{source_idx}. {base_name}.jsonl')
+
+
+def render_html_header(base_name: str) -> str:
+    """
+    Начало HTML — пишется один раз, при создании файла.
+    """
+    return (
+        '<!DOCTYPE html>\n'
+        '<html lang="uk">\n<head>\n<meta charset="UTF-8">\n<title>Документы Prozorro</title>\n</head>\n'
+        '<body style="font-family: Arial, sans-serif; margin:20px;">\n'
+        f'<h1>Джерело: {base_name}</h1>\n'
+        '<hr style="border:1px solid #444;">\n'
+    )
+
+
+def render_tender_block(tender_id: str, files: list) -> str:
+    """
+    Блок одного тендера: заголовок, ссылка на Prozorro и список документов.
+    """
+    tender_url = f"https://prozorro.gov.ua/tender/{tender_id}"
+    parts = [
+        f'<h2>Тендер: {tender_id}</h2>\n',
+        f'<p><a href="{tender_url}" target="_blank" style="color:#0066cc;">Открыть тендер на Prozorro</a></p>\n',
+        '<ul>\n',
+    ]
+
+    if not files:
+        parts.append('<li>Документов не найдено</li>\n')
+    else:
+        for name, href in files:
+            safe_name = name.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('"', '&quot;')
+            parts.append(f'<li><a href="{href}" target="_blank">{safe_name}</a></li>\n')
+
+    parts.append('</ul>\n')
+    parts.append('<hr style="border:1px dashed #999; margin:20px 0;">\n')
+    return "".join(parts)
+
+
+def save_files_as_html(tender_id: str, files: list, base_name: str, source_idx: int) -> bool:
     """
     Сама решает, куда сохранять: в output/output_data/{base_name}.html
     Создаёт папку, если нет.
     Если файла нет — создаёт с началом HTML.
     Дописывает тендер и документы.
+    Синхронная версия; в async-коде — utils/output_sink.HtmlOutputSink.
+    Возвращает False, если записать не удалось.
     """
 
-    output_folder = "output_data"
-    file_name = f'{source_idx}. {base_name}'
-    if not file_name.lower().endswith('.html'):
-        file_name += '.html'
-
-    output_filename = os.path.join(output_folder, file_name)
+    output_filename = output_html_path(base_name, source_idx)
 
     try:
 
-        os.makedirs(output_folder, exist_ok=True)
+        os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 
         # Проверяем, существует ли файл — если нет, пишем начало HTML
         if not os.path.exists(output_filename):
             with open(output_filename, "w", encoding="utf-8") as f:
-                f.write('<!DOCTYPE html>\n')
-                f.write('<html lang="uk">\n<head>\n<meta charset="UTF-8">\n<title>Документы Prozorro</title>\n</head>\n')
-                f.write('<body style="font-family: Arial, sans-serif; margin:20px;">\n')
-                f.write(f'<h1>Джерело: {base_name}</h1>\n')
-                f.write('<hr style="border:1px solid #444;">\n')
-
-        tender_url = f"https://prozorro.gov.ua/tender/{tender_id}"
+                f.write(render_html_header(base_name))
 
         with open(output_filename, "a", encoding="utf-8") as f:
-            f.write(f'<h2>Тендер: {tender_id}</h2>\n')
-            f.write(f'<p><a href="{tender_url}" target="_blank" style="color:#0066cc;">Открыть тендер на Prozorro</a></p>\n')
-            f.write('<ul>\n')
-
-            if not files:
-                f.write('<li>Документов не найдено</li>\n')
-            else:
-                for name, href in files:
-                    safe_name = name.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('"', '&quot;')
-                    f.write(f'<li><a href="{href}" target="_blank">{safe_name}</a></li>\n')
-
-            f.write('</ul>\n')
-            f.write('<hr style="border:1px dashed #999; margin:20px 0;">\n')
+            f.write(render_tender_block(tender_id, files))
 
         if len(files) > 0:
             print(f'[ОК] Сохранено {len(files)} документов → {output_filename}')
+        return True
 
     except Exception as e:
         print(f"[ОШИБКА СОХРАНЕНИЯ] Тендер {tender_id}: {e}")
+        return False
 
 
 if "__main__" == __name__:
@@ -0,0 +1,70 @@
+import asyncio
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# hashlib отпускает GIL на кусках > 2 КБ — хеши разных загрузок считаются параллельно на разных ядрах
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", min(8, os.cpu_count() or 1)))
+HASH_CHUNK_SIZE = 1024 * 1024
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def hash_executor() -> ThreadPoolExecutor:
+    """
+    Общий пул потоков для хеширования и записи скачанных файлов (размер — HASH_WORKERS).
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="hash")
+    return _executor
+
+
+def set_hash_workers(workers: int):
+    """
+    Пересоздаёт пул с другим размером (для бенчмарков и тонкой настройки).
+    """
+    global _executor, HASH_WORKERS
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+    HASH_WORKERS = workers
+    _executor = None
+
+
+async def run_in_hash_pool(func: Callable[..., Any], *args) -> Any:
+    return await asyncio.get_running_loop().run_in_executor(hash_executor(), func, *args)
+
+
+def write_and_hash(f: BinaryIO, hasher, chunk: bytes):
+    """
+    Один заход в пул на кусок: дописать в файл и добавить в хеш.
+    """
+    hasher.update(chunk)
+    f.write(chunk)
+
+
+def hash_file_into(path: Path | str, hasher, chunk_size: int = HASH_CHUNK_SIZE) -> int:
+    """
+    Дочитывает файл в hasher, возвращает размер. Синхронная — вызывать через run_in_hash_pool.
+    """
+    size = 0
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            hasher.update(chunk)
+            size += len(chunk)
+    return size
+
+
+async def sha256_file(path: Path | str) -> tuple[str, int]:
+    """
+    (SHA-256 hex, размер) файла с диска — не блокируя event loop.
+    """
+    hasher = hashlib.sha256()
+    size = await run_in_hash_pool(hash_file_into, path, hasher)
+    return hasher.hexdigest(), size
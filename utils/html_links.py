@@ -0,0 +1,69 @@
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+READ_CHUNK_SIZE = 1024 * 1024  # символов за одно чтение файла
+
+
+class _LinkParser(HTMLParser):
+    """
+    Собирает события по мере разбора: ("a", текст, href) и ("h2", текст, None).
+    Дерево документа не строится — в памяти только ещё не отданные события.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.events: List[Tuple[str, str, Optional[str]]] = []
+        self._tag: Optional[str] = None
+        self._href: Optional[str] = None
+        self._text: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("a", "h2") and self._tag is None:
+            self._tag = tag
+            self._href = dict(attrs).get("href") if tag == "a" else None
+            self._text = []
+
+    def handle_endtag(self, tag):
+        if tag == self._tag:
+            self.events.append((tag, "".join(self._text), self._href))
+            self._tag = None
+
+    def handle_data(self, data):
+        if self._tag is not None:
+            self._text.append(data)
+
+
+def _iter_events(path: Path | str, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[Tuple[str, str, Optional[str]]]:
+    parser = _LinkParser()
+    with open(path, encoding="utf-8", errors="replace") as f:
+        while chunk := f.read(chunk_size):
+            parser.feed(chunk)
+            yield from parser.events
+            parser.events.clear()
+    parser.close()
+    yield from parser.events
+
+
+def iter_links(path: Path | str, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[Tuple[str, Optional[str]]]:
+    """
+    Потоково отдаёт (текст, href) всех <a> из HTML-файла — как
+    [(a.text, a.get("href")) for a in BeautifulSoup(html).find_all("a")], но без чтения
+    файла целиком и без дерева: память не зависит от размера файла.
+    """
+    for tag, text, href in _iter_events(path, chunk_size):
+        if tag == "a":
+            yield text, href
+
+
+def iter_tender_links(path: Path | str, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[Tuple[Optional[str], str, Optional[str]]]:
+    """
+    (tender_id, текст, href) для ссылок отчёта output_data (формат utils/funcs.render_tender_block):
+    tender_id берётся из ближайшего предыдущего <h2>Тендер: ...</h2>.
+    """
+    tender_id = None
+    for tag, text, href in _iter_events(path, chunk_size):
+        if tag == "h2":
+            tender_id = text.removeprefix("Тендер:").strip()
+        else:
+            yield tender_id, text, href
@@ -0,0 +1,50 @@
+"""
+Инкрементальный обход источника по dateModified: вместо всех страниц поиска с первой —
+только тендеры, изменённые после чекпоинта источника (таблица source_checkpoints).
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+# параметр поиска «изменён не раньше» (формат как в dateModified ответа поиска)
+MODIFIED_SINCE_KEY = "dateModified[start]"
+# запас назад от чекпоинта: индексация поиска отстаёт, часы сервера и наши — не совпадают
+INCREMENTAL_OVERLAP = timedelta(hours=1)
+
+
+def parse_date_modified(value: Optional[str]) -> Optional[datetime]:
+    """
+    ISO-дата из API ("2025-03-01T12:30:00.123456+02:00") → naive UTC (так она хранится в БД).
+    None — если даты нет или она не разбирается.
+    """
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def with_modified_since(params: dict, since: datetime) -> dict:
+    """
+    Копия параметров поиска с фильтром по dateModified (since — naive UTC из чекпоинта).
+    """
+    result = params.copy()
+    start = (since - INCREMENTAL_OVERLAP).replace(tzinfo=timezone.utc)
+    result[MODIFIED_SINCE_KEY] = start.isoformat(timespec="seconds")
+    return result
+
+
+def is_modified(item_modified: Optional[datetime], stored: Optional[datetime],
+                checkpoint: Optional[datetime]) -> bool:
+    """
+    Изменился ли уже обработанный тендер с прошлого раза.
+    Сравнение с его собственным date_modified, а для старых записей без даты — с чекпоинтом
+    источника (без чекпоинта такие тендеры по-прежнему пропускаются).
+    """
+    if item_modified is None:
+        return False
+    baseline = stored or checkpoint
+    return baseline is not None and item_modified > baseline
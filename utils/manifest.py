@@ -0,0 +1,149 @@
+"""
+Манифест собранных документов: output_data/{idx}. {name}.jsonl (пишет utils/output_sink.ManifestSink).
+
+Одна строка — один документ:
+    {"tender_id": ..., "title": ..., "url": ..., "document_type": ..., "group": ..., "lot_id": ..., "bid_id": ...}
+
+По желанию JSONL сжимается в Parquet (нужен pyarrow: pip install pyarrow):
+    python -m utils.manifest output_data/"5. Назва.jsonl"
+"""
+import argparse
+import importlib.util
+import json
+import os
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+from utils.funcs import OUTPUT_FOLDER, output_html_path, output_manifest_path
+from utils.html_links import iter_tender_links
+
+MANIFEST_FIELDS = ("tender_id", "title", "url", "document_type", "group", "lot_id", "bid_id")
+
+
+def parquet_available() -> bool:
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def manifest_record(doc: dict, group: str, bid_id: Optional[str] = None, lot_id: Optional[str] = None) -> dict:
+    """
+    Запись о документе из publicDocuments ставки (без tender_id — его добавляет ManifestSink).
+    """
+    return {
+        "title": doc.get("title", "Без назви").strip(),
+        "url": doc.get("url", "").strip(),
+        "document_type": doc.get("documentType"),
+        "group": group,
+        "lot_id": lot_id,
+        "bid_id": bid_id,
+    }
+
+
+def read_manifest(path: Path | str) -> Iterator[dict]:
+    """
+    Читает манифест построчно (.jsonl) или целиком (.parquet). Битые строки пропускаются —
+    например, недописанная последняя строка после падения.
+    """
+    path = Path(path)
+    if path.suffix == ".parquet":
+        import pyarrow.parquet as pq
+        yield from pq.read_table(path).to_pylist()
+        return
+
+    with path.open(encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                print(f"[MANIFEST] ⚠️  {path.name}:{line_no} — битая строка, пропускаем")
+
+
+def records_from_html(path: Path | str) -> Iterator[dict]:
+    """
+    Записи манифеста из HTML-отчёта (формат utils/funcs.render_tender_block) — для источников,
+    собранных до появления манифеста. Известны только tender_id, title и url.
+    """
+    for tender_id, title, href in iter_tender_links(path):
+        # ссылка «Открыть тендер на Prozorro» — не документ
+        if not href or href == f"https://prozorro.gov.ua/tender/{tender_id}":
+            continue
+        record = {field: None for field in MANIFEST_FIELDS}
+        record.update(tender_id=tender_id, title=title.strip(), url=href)
+        yield record
+
+
+def to_jsonl(tender_id: str, documents: List[dict]) -> str:
+    return "".join(json.dumps({"tender_id": tender_id, **doc}, ensure_ascii=False) + "\n" for doc in documents)
+
+
+def seed_manifest_from_html(base_name: str, source_idx: int) -> int:
+    """
+    Если манифеста ещё нет, а HTML уже есть (источник собирался раньше), заполняет манифест
+    ссылками из HTML — чтобы загрузчик видел все документы источника. Вызывать до записи
+    новых тендеров в HTML. Возвращает число перенесённых документов.
+    """
+    manifest_path = output_manifest_path(base_name, source_idx)
+    html_path = output_html_path(base_name, source_idx)
+    if os.path.exists(manifest_path) or not os.path.exists(html_path):
+        return 0
+
+    os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+    count = 0
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        for record in records_from_html(html_path):
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            count += 1
+    print(f"[MANIFEST] 📋 {manifest_path}: перенесено из HTML {count} документов")
+    return count
+
+
+def append_manifest(tender_id: str, documents: List[dict], base_name: str, source_idx: int) -> bool:
+    """
+    Синхронная дозапись документов тендера в манифест (для api_scraper.py).
+    В async-коде — utils/output_sink.ManifestSink. Возвращает False, если записать не удалось.
+    """
+    if not documents:
+        return True
+    try:
+        os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+        with open(output_manifest_path(base_name, source_idx), "a", encoding="utf-8") as f:
+            f.write(to_jsonl(tender_id, documents))
+        return True
+    except Exception as e:
+        print(f"[ОШИБКА СОХРАНЕНИЯ] Манифест, тендер {tender_id}: {e}")
+        return False
+
+
+def compact_to_parquet(path: Path | str) -> Optional[Path]:
+    """
+    JSONL → Parquet рядом с исходным файлом. Без pyarrow возвращает None.
+    """
+    if not parquet_available():
+        print("⚠️  [MANIFEST] pyarrow не установлен — Parquet не создаём")
+        return None
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    path = Path(path)
+    columns = {field: [] for field in MANIFEST_FIELDS}
+    for record in read_manifest(path):
+        for field in MANIFEST_FIELDS:
+            value = record.get(field)
+            columns[field].append(None if value is None else str(value))
+
+    table = pa.table({field: pa.array(values, pa.string()) for field, values in columns.items()})
+    out = path.with_suffix(".parquet")
+    pq.write_table(table, out, compression="zstd")
+    print(f"[MANIFEST] 🗜  {path.name} → {out.name} ({table.num_rows} документов)")
+    return out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Сжатие JSONL-манифестов в Parquet")
+    parser.add_argument("paths", nargs="+", help="файлы output_data/*.jsonl")
+    args = parser.parse_args()
+
+    for p in args.paths:
+        compact_to_parquet(p)
@@ -0,0 +1,180 @@
+import asyncio
+import os
+from typing import Awaitable, Callable, Dict, List, Optional, Set, TextIO, Tuple
+
+from utils.funcs import (
+    OUTPUT_FOLDER, output_html_path, output_manifest_path, render_html_header, render_tender_block,
+)
+from utils.html_links import iter_tender_links
+from utils.manifest import read_manifest, seed_manifest_from_html, to_jsonl
+from utils.write_behind import WriteBehindBuffer
+
+
+class BufferedFileSink(WriteBehindBuffer[Tuple[str, str]]):
+    """
+    Асинхронная дозапись в файл output_data (write-behind, utils/write_behind.py).
+
+    Воркеры кладут готовые блоки тендеров (без обращения к диску), файл держится открытым,
+    накопленные блоки дописываются одной записью в отдельном потоке (asyncio.to_thread) —
+    каждые batch_size тендеров или раз в flush_interval сек.
+    Использовать как async-контекст: при выходе всё накопленное дописывается и файл закрывается.
+
+    on_flushed(tender_ids) вызывается после того, как блоки этих тендеров записаны в файл.
+    Какие документы (tender_id, url) в файле уже есть, читается только при первом new_documents —
+    то есть лишь когда в проходе есть переобработанный тендер.
+    """
+
+    def __init__(self, path: str, batch_size: int = 50, flush_interval: float = 2.0,
+                 on_flushed: Optional[Callable[[List[str]], Awaitable[None]]] = None):
+        super().__init__(self._write_blocks, path, batch_size, flush_interval)
+        self.path = path
+        self.on_flushed = on_flushed
+        self._file: Optional[TextIO] = None
+        self._known: Optional[Set[Tuple[str, str]]] = None
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await super().__aexit__(exc_type, exc, tb)
+        if self._file is not None:
+            await asyncio.to_thread(self._file.close)
+            self._file = None
+
+    def _load_known(self) -> Set[Tuple[str, str]]:
+        """
+        (tender_id, url) документов, уже записанных в файл.
+        """
+        return set()
+
+    async def new_documents(self, tender_id: str, documents: List[dict]) -> List[dict]:
+        """
+        Документы тендера, которых в этом файле ещё нет. Переобработанный тендер (изменился
+        dateModified или недообработан в прерванном проходе) дописывает только новые документы,
+        а не второй такой же блок. Для остальных тендеров не вызывается — их в файле быть не может.
+        """
+        if self._known is None:
+            async with self._lock:  # файл читается целиком — пока он не дописывается
+                if self._known is None:
+                    self._known = await asyncio.to_thread(self._load_known)
+        fresh = [doc for doc in documents if (tender_id, doc["url"]) not in self._known]
+        self._known.update((tender_id, doc["url"]) for doc in fresh)
+        return fresh
+
+    def _add_block(self, tender_id: str, block: str):
+        self._push((tender_id, block))
+
+    def _describe(self, item: Tuple[str, str]) -> str:
+        return item[0]
+
+    def _header(self) -> str:
+        """
+        Что написать в начало нового файла.
+        """
+        return ""
+
+    def _open(self) -> TextIO:
+        os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+        # Если файла нет — пишем начало
+        header = self._header()
+        if header and not os.path.exists(self.path):
+            with open(self.path, "w", encoding="utf-8") as f:
+                f.write(header)
+        return open(self.path, "a", encoding="utf-8")
+
+    def _write(self, chunk: str):
+        if self._file is None:
+            self._file = self._open()
+        try:
+            self._file.write(chunk)
+            self._file.flush()
+        except Exception:
+            self._file.close()  # при следующей попытке файл откроется заново
+            self._file = None
+            raise
+
+    async def _write_blocks(self, batch: List[Tuple[str, str]]) -> int:
+        await asyncio.to_thread(self._write, "".join(block for _, block in batch))
+        return len(batch)
+
+    async def _on_flushed(self, batch: List[Tuple[str, str]]):
+        if self.on_flushed is not None:
+            await self.on_flushed([tender_id for tender_id, _ in batch])
+
+
+class HtmlOutputSink(BufferedFileSink):
+    """
+    output_data/{idx}. {name}.html — тот же формат, что у save_files_as_html.
+    """
+
+    def __init__(self, base_name: str, source_idx: int, batch_size: int = 50, flush_interval: float = 2.0,
+                 on_flushed: Optional[Callable[[List[str]], Awaitable[None]]] = None):
+        super().__init__(output_html_path(base_name, source_idx), batch_size, flush_interval, on_flushed)
+        self.base_name = base_name
+
+    def _header(self) -> str:
+        return render_html_header(self.base_name)
+
+    def _load_known(self) -> Set[Tuple[str, str]]:
+        if not os.path.exists(self.path):
+            return set()
+        return {(tender_id, href) for tender_id, _, href in iter_tender_links(self.path) if href}
+
+    async def add(self, tender_id: str, files: List[Tuple[str, str]]):
+        self._add_block(tender_id, render_tender_block(tender_id, files))
+        if len(files) > 0:
+            print(f'[ОК] Сохранено {len(files)} документов → {self.path}')
+
+
+class ManifestSink(BufferedFileSink):
+    """
+    output_data/{idx}. {name}.jsonl — по строке JSON на документ:
+    tender_id, title, url, document_type, group, lot_id, bid_id (см. utils/manifest.py).
+
+    При входе переносит в новый манифест ссылки из уже существующего HTML (seed_manifest_from_html).
+    """
+
+    def __init__(self, base_name: str, source_idx: int, batch_size: int = 50, flush_interval: float = 2.0,
+                 on_flushed: Optional[Callable[[List[str]], Awaitable[None]]] = None):
+        super().__init__(output_manifest_path(base_name, source_idx), batch_size, flush_interval, on_flushed)
+        self.base_name = base_name
+        self.source_idx = source_idx
+
+    async def __aenter__(self):
+        # до первой записи HtmlOutputSink, иначе в манифест попадут и тендеры этого запуска
+        await asyncio.to_thread(seed_manifest_from_html, self.base_name, self.source_idx)
+        return await super().__aenter__()
+
+    def _load_known(self) -> Set[Tuple[str, str]]:
+        if not os.path.exists(self.path):
+            return set()
+        return {(record.get("tender_id"), record.get("url")) for record in read_manifest(self.path)}
+
+    async def add(self, tender_id: str, documents: List[dict]):
+        self._add_block(tender_id, to_jsonl(tender_id, documents))
+
+
+class OutputBarrier:
+    """
+    Тендер с документами передаётся дальше (release — запись в tenders) только после того,
+    как его блоки дописаны во все файлы вывода (HTML и манифест). Иначе при сбое тендер мог
+    оказаться в tenders без блока в output_data — и больше никогда не обрабатывался бы.
+
+    expect(tender_id, n) — перед постановкой блоков в n sink-ов; flushed — их on_flushed.
+    """
+
+    def __init__(self, release: Callable[[str], Awaitable[None]]):
+        self.release = release
+        self._waiting: Dict[str, int] = {}  # tender_id → сколько sink-ов ещё не записали блок
+
+    def __len__(self) -> int:
+        return len(self._waiting)
+
+    def expect(self, tender_id: str, sinks: int):
+        self._waiting[tender_id] = self._waiting.get(tender_id, 0) + sinks
+
+    async def flushed(self, tender_ids: List[str]):
+        for tender_id in tender_ids:
+            left = self._waiting.get(tender_id, 1) - 1
+            if left > 0:
+                self._waiting[tender_id] = left
+                continue
+            self._waiting.pop(tender_id, None)
+            await self.release(tender_id)
@@ -0,0 +1,103 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, List, Optional
+
+_DONE = object()  # сигнал завершения для воркеров стадии
+
+
+class Stage:
+    """
+    Стадия конвейера: ограниченная очередь + свой пул воркеров.
+    handler(item) обрабатывает элемент и сам передаёт результат дальше (await next_stage.put(...)).
+    Ошибки handler-а считаются и печатаются, стадия продолжает работу.
+    """
+
+    def __init__(self, name: str, handler: Callable[[Any], Awaitable[None]], workers: int, queue_size: int):
+        self.name = name
+        self.handler = handler
+        self.workers_count = workers
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+        self.processed = 0
+        self.errors = 0
+        self.busy = 0
+        self._tasks: List[asyncio.Task] = []
+        self._started_at: Optional[float] = None
+
+    async def put(self, item: Any):
+        await self.queue.put(item)
+
+    def start(self):
+        self._started_at = time.monotonic()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers_count)]
+
+    async def close(self):
+        """
+        Дожидается обработки всего, что уже в очереди, и останавливает воркеров.
+        """
+        for _ in self._tasks:
+            await self.queue.put(_DONE)
+        await asyncio.gather(*self._tasks)
+
+    async def _worker(self):
+        while True:
+            item = await self.queue.get()
+            if item is _DONE:
+                break
+            self.busy += 1
+            try:
+                await self.handler(item)
+            except Exception as e:
+                self.errors += 1
+                print(f"[PIPELINE] 🔴 {self.name}: {type(e).__name__}: {e}")
+            finally:
+                self.busy -= 1
+                self.processed += 1
+
+    def rate(self) -> float:
+        if self._started_at is None:
+            return 0.0
+        return self.processed / max(time.monotonic() - self._started_at, 1e-9)
+
+    def status(self) -> str:
+        return (
+            f"{self.name}: очередь {self.queue.qsize()}/{self.queue.maxsize} | "
+            f"в работе {self.busy}/{self.workers_count} | готово {self.processed} ({self.rate():.2f}/с)"
+            + (f" | ошибок {self.errors}" if self.errors else "")
+        )
+
+
+class Pipeline:
+    """
+    Цепочка стадий. Закрывается по порядку: стадия закрывается только после того,
+    как закончили все предыдущие, — поэтому ничего не теряется.
+    """
+
+    def __init__(self, stages: List[Stage], name: str = "", report_interval: float = 30.0):
+        self.stages = stages
+        self.name = name
+        self.report_interval = report_interval
+        self._reporter: Optional[asyncio.Task] = None
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+        self._reporter = asyncio.create_task(self._report_loop())
+
+    async def close(self):
+        try:
+            for stage in self.stages:
+                await stage.close()
+        finally:
+            if self._reporter is not None:
+                self._reporter.cancel()
+        print(self.status())
+
+    def status(self) -> str:
+        header = f"[PIPELINE {self.name}]" if self.name else "[PIPELINE]"
+        return header + "\n" + "\n".join(f"  {stage.status()}" for stage in self.stages)
+
+    async def _report_loop(self):
+        while True:
+            await asyncio.sleep(self.report_interval)
+            print(self.status())
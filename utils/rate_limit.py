@@ -0,0 +1,143 @@
+import asyncio
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+# Стартовые скорости (запросов/сек) по типу запроса — на один прокси
+INITIAL_RATES = {
+    "search": 1.0,
+    "details": 3.0,
+    "lots": 3.0,
+}
+MIN_RATE = 0.2
+MAX_RATE = 20.0
+INCREASE_STEP = 0.05      # +rps за каждый успешный запрос (аддитивный рост)
+DECREASE_FACTOR = 0.5     # ×rate на 429 (мультипликативное снижение)
+DECREASE_COOLDOWN = 2.0   # не снижаем чаще, чем раз в N сек — пачка 429 от одного всплеска считается за один
+
+# Потолок на хост по всем прокси вместе (запросов/сек): AIMD-лимитеры — на каждый прокси,
+# и без общего потолка суммарная нагрузка на prozorro росла бы с числом прокси
+HOST_RATES = {
+    "search": 1.0,
+    "details": 10.0,
+    "lots": 10.0,
+}
+
+
+class AdaptiveRateLimiter:
+    """
+    Лимитер по схеме AIMD: запросы идут равномерно со скоростью rate,
+    после 429 скорость режется вдвое, после успехов — плавно растёт.
+    Общий для всех корутин (и потоков), которые ходят через один прокси в один эндпоинт.
+    """
+
+    def __init__(self, rate: float, min_rate: float = MIN_RATE, max_rate: float = MAX_RATE):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+
+        self.requests = 0
+        self.throttled = 0
+
+        self._next_slot = 0.0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + 1.0 / self.rate
+            self.requests += 1
+            return slot - now
+
+    async def acquire(self):
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def acquire_blocking(self):
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    def on_success(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + INCREASE_STEP)
+
+    def on_throttle(self):
+        with self._lock:
+            self.throttled += 1
+            now = time.monotonic()
+            if now - self._last_decrease < DECREASE_COOLDOWN:
+                return
+            self._last_decrease = now
+            self.rate = max(self.min_rate, self.rate * DECREASE_FACTOR)
+            # пауза перед следующим запросом, чтобы сервер «остыл»
+            self._next_slot = max(self._next_slot, now) + 1.0 / self.rate
+
+
+_limiters: Dict[Tuple[str, str], AdaptiveRateLimiter] = {}
+_host_limiters: Dict[Tuple[str, str], AdaptiveRateLimiter] = {}
+_registry_lock = threading.Lock()
+
+
+def proxy_label(proxy: Optional[str]) -> str:
+    return proxy.split("@")[-1] if proxy else "без прокси"
+
+
+def limiter_for(proxy: Optional[str], endpoint: str) -> AdaptiveRateLimiter:
+    """
+    Один общий лимитер на пару (прокси, эндпоинт).
+    """
+    key = (proxy_label(proxy), endpoint)
+    with _registry_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = _limiters[key] = AdaptiveRateLimiter(INITIAL_RATES.get(endpoint, 1.0))
+        return limiter
+
+
+def host_limiter(url: str, endpoint: str) -> AdaptiveRateLimiter:
+    """
+    Один общий лимитер на пару (хост, эндпоинт) — для всех прокси и всех корутин/потоков.
+    Скорость фиксированная (HOST_RATES): это потолок, AIMD по прокси работает под ним.
+    Брать после limiter_for(...).acquire(), непосредственно перед запросом.
+    """
+    key = (urlparse(url).netloc, endpoint)
+    with _registry_lock:
+        limiter = _host_limiters.get(key)
+        if limiter is None:
+            rate = HOST_RATES.get(endpoint, 1.0)
+            limiter = _host_limiters[key] = AdaptiveRateLimiter(rate, min_rate=rate, max_rate=rate)
+        return limiter
+
+
+def rate_metrics() -> Dict[str, dict]:
+    """
+    Текущая скорость и счётчики 429 по каждому (прокси, эндпоинт) и потолки по хостам.
+    """
+    metrics = {
+        f"{endpoint}@{proxy}": {
+            "rate": round(limiter.rate, 2),
+            "requests": limiter.requests,
+            "throttled": limiter.throttled,
+        }
+        for (proxy, endpoint), limiter in sorted(_limiters.items())
+    }
+    for (host, endpoint), limiter in sorted(_host_limiters.items()):
+        metrics[f"{endpoint}@{host} (хост)"] = {
+            "rate": round(limiter.rate, 2),
+            "requests": limiter.requests,
+            "throttled": limiter.throttled,
+        }
+    return metrics
+
+
+def format_rate_metrics() -> str:
+    lines = [
+        f"{key:<40} {m['rate']:>6.2f} rps | запросов: {m['requests']:>6} | 429: {m['throttled']:>4}"
+        for key, m in rate_metrics().items()
+    ]
+    return "\n".join(lines)
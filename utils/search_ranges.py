@@ -0,0 +1,133 @@
+"""
+Автоматическое разбиение поиска по цене (value.start / value.end),
+чтобы каждый кусок укладывался в лимит API в 10 000 результатов.
+Вместо ручных Ч.1 / Ч.2 / ... в SOURCES.
+"""
+import asyncio
+import math
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+RESULTS_CAP = 10000            # больше API не отдаёт
+VALUE_START_KEY = "value[amount][start]"
+VALUE_END_KEY = "value[amount][end]"
+VALUE_CURRENCY_KEY = "value[currency]"
+VALUE_MIN = 0
+VALUE_MAX = 1_000_000_000_000  # верхняя граница, если в URL не задана
+
+# (params, первая страница) — готовый к обходу кусок поиска
+Slice = Tuple[dict, dict]
+# (готовые куски, пропущенные диапазоны: первая страница не получена или делить больше некуда)
+SlicePlan = Tuple[List[Slice], List[dict]]
+
+
+def value_range(params: dict) -> Tuple[int, int]:
+    start = int(float(params.get(VALUE_START_KEY, VALUE_MIN)))
+    end = int(float(params.get(VALUE_END_KEY, VALUE_MAX)))
+    return start, end
+
+
+def with_value_range(params: dict, start: int, end: int) -> dict:
+    """
+    Копия параметров с диапазоном цены. Валюта — только та, что была в исходном запросе:
+    без фильтра по валюте куски должны покрывать и не-UAH тендеры.
+    """
+    result = params.copy()
+    result[VALUE_START_KEY] = str(start)
+    result[VALUE_END_KEY] = str(end)
+    return result
+
+
+def split_value_range(start: int, end: int) -> Optional[Tuple[Tuple[int, int], Tuple[int, int]]]:
+    """
+    Делит диапазон пополам. Цены распределены примерно логарифмически
+    (мелких закупок на порядки больше), поэтому середина — геометрическая.
+    None — делить больше нечего.
+    """
+    if end - start <= 1:
+        return None
+    mid = int(math.sqrt(max(start, 1) * end))
+    if not start < mid < end:
+        mid = (start + end) // 2
+    return (start, mid), (mid, end)
+
+
+def _describe(params: dict) -> str:
+    start, end = value_range(params)
+    currency = params.get(VALUE_CURRENCY_KEY)
+    unit = {"UAH": " грн", None: ""}.get(currency, f" {currency}")
+    return f"{start:,}–{end:,}{unit}".replace(",", " ")
+
+
+def plan_slices_sync(search_params: dict, fetch_first_page: Callable[[dict], Optional[dict]]) -> SlicePlan:
+    """
+    Пробует поиск как есть и, пока total >= RESULTS_CAP, рекурсивно делит
+    диапазон цены пополам. fetch_first_page(params) — запрос первой страницы.
+
+    Возвращает (куски, пропущенные диапазоны). Если пропущенные есть — обход неполный:
+    вызывающий не должен сохранять такой план в журнал и двигать чекпоинт.
+    """
+    slices: List[Slice] = []
+    dropped: List[dict] = []
+    stack = [search_params]
+
+    while stack:
+        params = stack.pop()
+        page_data = fetch_first_page(params)
+        if not page_data:
+            print(f"[SPLIT] ❌ Нет данных для диапазона {_describe(params)}")
+            dropped.append(params)
+            continue
+
+        total = page_data.get("total", 0)
+        if total < RESULTS_CAP:
+            slices.append((params, page_data))
+            continue
+
+        halves = split_value_range(*value_range(params))
+        if halves is None:
+            print(f"🔴 [SPLIT] {total} тендеров в диапазоне {_describe(params)} — делить больше некуда, пропускаем")
+            dropped.append(params)
+            continue
+
+        print(f"[SPLIT] {total} тендеров в диапазоне {_describe(params)} → делим пополам")
+        stack.extend(with_value_range(params, *half) for half in reversed(halves))
+
+    return slices, dropped
+
+
+async def plan_slices(search_params: dict, fetch_first_page: Callable[[dict], Awaitable[Optional[dict]]]) -> SlicePlan:
+    """
+    Async-версия plan_slices_sync: диапазоны одного уровня деления пробуются параллельно.
+    """
+    slices: List[Slice] = []
+    dropped: List[dict] = []
+    level = [search_params]
+
+    while level:
+        pages = await asyncio.gather(*(fetch_first_page(params) for params in level))
+        next_level = []
+
+        for params, page_data in zip(level, pages):
+            if not page_data:
+                print(f"[SPLIT] ❌ Нет данных для диапазона {_describe(params)}")
+                dropped.append(params)
+                continue
+
+            total = page_data.get("total", 0)
+            if total < RESULTS_CAP:
+                slices.append((params, page_data))
+                continue
+
+            halves = split_value_range(*value_range(params))
+            if halves is None:
+                print(f"🔴 [SPLIT] {total} тендеров в диапазоне {_describe(params)} — делить больше некуда, пропускаем")
+                dropped.append(params)
+                continue
+
+            print(f"[SPLIT] {total} тендеров в диапазоне {_describe(params)} → делим пополам")
+            next_level.extend(with_value_range(params, *half) for half in halves)
+
+        level = next_level
+
+    slices.sort(key=lambda s: value_range(s[0]))
+    return slices, dropped
@@ -0,0 +1,79 @@
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Iterable, Optional
+
+# ё → е и варианты апострофа в украинских названиях: м'який / м’який / мʼякий / м`який
+_REPLACEMENTS = (("ё", "е"), ("’", "'"), ("ʼ", "'"), ("‘", "'"), ("`", "'"), ("´", "'"))
+_NEEDS_REPLACE = re.compile("[" + "".join(old for old, _ in _REPLACEMENTS) + "]")
+
+
+def normalize_title(text: str) -> str:
+    """
+    Приведение названия к виду для сравнения: NFKC (лигатуры, полноширинные символы),
+    casefold, ё → е, один вид апострофа.
+    NFKC и замены выполняются, только если в строке есть что менять (str.translate
+    на кириллице в разы медленнее цепочки replace).
+    """
+    if not unicodedata.is_normalized("NFKC", text):
+        text = unicodedata.normalize("NFKC", text)
+    text = text.casefold()
+    if _NEEDS_REPLACE.search(text):
+        for old, new in _REPLACEMENTS:
+            text = text.replace(old, new)
+    return text
+
+
+def _minimal_words(words: Iterable[str]) -> list[str]:
+    """
+    Для поиска подстрок достаточно самых коротких слов: если в названии есть «паспорт»,
+    то есть и «пас». Слова, содержащие другое слово из набора, выкидываются.
+    """
+    unique = sorted({normalize_title(w) for w in words if w}, key=len)
+    result: list[str] = []
+    for word in unique:
+        if not any(shorter in word for shorter in result):
+            result.append(word)
+    return result
+
+
+class KeywordMatcher:
+    """
+    Поиск любого из слов как подстроки — одним заранее скомпилированным regex
+    вместо any(kw.lower() in name.lower() for kw in words) на каждое название.
+    Слова и название нормализуются одинаково (normalize_title).
+    """
+
+    def __init__(self, words: Iterable[str]):
+        self.words = tuple(words)
+        self.patterns = _minimal_words(self.words)
+        self._regex = re.compile("|".join(map(re.escape, self.patterns))) if self.patterns else None
+
+    def find(self, text: str) -> Optional[str]:
+        """
+        Первое найденное слово (в нормализованном виде, из self.patterns) или None.
+        """
+        if self._regex is None or not text:
+            return None
+        m = self._regex.search(normalize_title(text))
+        return m.group(0) if m else None
+
+    def search(self, text: str) -> bool:
+        return self.find(text) is not None
+
+    def search_normalized(self, normalized: str) -> bool:
+        """
+        То же, что search, для уже нормализованной строки — когда одно название
+        проверяется несколькими матчерами (ключевые слова, затем стоп-слова).
+        """
+        return self._regex is not None and self._regex.search(normalized) is not None
+
+    __call__ = search
+
+
+@lru_cache(maxsize=32)
+def matcher_for(words: tuple[str, ...]) -> KeywordMatcher:
+    """
+    Один скомпилированный матчер на набор слов.
+    """
+    return KeywordMatcher(words)
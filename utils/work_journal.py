@@ -0,0 +1,133 @@
+"""
+Журнал работы по источнику (LOGS/journal/{idx}.jsonl) — чтобы прерванный проход
+(сбой сети, защита 10k, Ctrl-C) продолжился ровно с места остановки.
+
+Только дописывается, по строке JSON на событие:
+  plan   — ценовые диапазоны поиска (повторно не планируются)
+  page   — страница диапазона получена; её тендеры, поставленные в работу, с dateModified
+  done   — тендеры записаны в tenders (после записи их блоков в HTML и манифест)
+  slice  — диапазон обойдён до конца
+При открытии журнал проигрывается: готовые страницы не запрашиваются заново, а тендеры
+из page без done (в очереди или в работе в момент сбоя) ставятся в работу первыми.
+После успешного прохода журнал удаляется.
+"""
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+JOURNAL_DIR = Path("LOGS/journal")
+
+
+def params_key(params: dict) -> str:
+    return hashlib.blake2b(json.dumps(params, sort_keys=True, ensure_ascii=False).encode(), digest_size=8).hexdigest()
+
+
+class WorkJournal:
+    """
+    Журнал одного источника. Запись синхронная и короткая (строка на страницу / пачку
+    тендеров), файл открывается на каждую запись — при падении процесса теряется не больше
+    недописанной строки.
+    """
+
+    def __init__(self, source_idx: int, search_params: dict, root: Path = JOURNAL_DIR):
+        self.path = root / f"{source_idx}.jsonl"
+        self.key = params_key(search_params)
+
+        self.slices: Optional[List[dict]] = None
+        self.pages: Dict[str, Set[int]] = {}
+        self.slice_meta: Dict[str, Tuple[int, int]] = {}  # slice → (total, per_page)
+        self.finished_slices: Set[str] = set()
+        self.queued: Dict[str, Optional[str]] = {}        # tender_id → dateModified (ISO)
+        self.done: Set[str] = set()
+
+    @classmethod
+    def open(cls, source_idx: int, search_params: dict, root: Path = JOURNAL_DIR) -> "WorkJournal":
+        """
+        Проигрывает существующий журнал источника. Журнал от других параметров поиска
+        (поменяли URL источника или чекпоинт) не подходит и начинается заново.
+        """
+        journal = cls(source_idx, search_params, root)
+        if journal.path.exists():
+            journal._replay()
+        if not journal.resumed:
+            journal.path.parent.mkdir(parents=True, exist_ok=True)
+            journal.path.write_text(json.dumps({"e": "start", "key": journal.key}) + "\n", encoding="utf-8")
+        return journal
+
+    def _replay(self):
+        with self.path.open(encoding="utf-8") as f:
+            lines = f.readlines()
+        try:
+            header = json.loads(lines[0]) if lines else {}
+        except json.JSONDecodeError:
+            header = {}
+        if header.get("key") != self.key:
+            return
+
+        for line in lines[1:]:
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # последняя строка могла не дописаться при сбое
+            kind = event.get("e")
+            if kind == "plan":
+                self.slices = event["slices"]
+            elif kind == "page":
+                self.pages.setdefault(event["slice"], set()).add(event["page"])
+                self.slice_meta[event["slice"]] = (event["total"], event["per_page"])
+                self.queued.update(event["ids"])
+            elif kind == "done":
+                self.done.update(event["ids"])
+            elif kind == "slice":
+                self.finished_slices.add(event["slice"])
+
+    @property
+    def resumed(self) -> bool:
+        return bool(self.slices or self.pages)
+
+    @property
+    def pending(self) -> Dict[str, Optional[str]]:
+        """
+        Тендеры, поставленные в работу, но не записанные в tenders.
+        """
+        return {t: dm for t, dm in self.queued.items() if t not in self.done}
+
+    def pages_done(self, slice_key: str) -> Set[int]:
+        return self.pages.get(slice_key, set())
+
+    def summary(self) -> str:
+        pages = sum(len(p) for p in self.pages.values())
+        return f"страниц готово: {pages}, тендеров не дообработано: {len(self.pending)}"
+
+    # ─── Запись ───
+
+    def _append(self, event: dict):
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+    def record_plan(self, slices: List[dict]):
+        self.slices = slices
+        self._append({"e": "plan", "slices": slices})
+
+    def record_page(self, slice_key: str, page: int, total: int, per_page: int, ids: Dict[str, Optional[str]]):
+        """
+        Пишется до того, как тендеры страницы попадут в очередь.
+        """
+        self.pages.setdefault(slice_key, set()).add(page)
+        self.slice_meta[slice_key] = (total, per_page)
+        self.queued.update(ids)
+        self._append({"e": "page", "slice": slice_key, "page": page, "total": total, "per_page": per_page, "ids": ids})
+
+    def record_done(self, tender_ids: Iterable[str]):
+        ids = list(tender_ids)
+        if ids:
+            self.done.update(ids)
+            self._append({"e": "done", "ids": ids})
+
+    def record_slice_done(self, slice_key: str):
+        self.finished_slices.add(slice_key)
+        self._append({"e": "slice", "slice": slice_key})
+
+    def clear(self):
+        self.path.unlink(missing_ok=True)
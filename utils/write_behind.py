@@ -0,0 +1,102 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Generic, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class WriteBehindBuffer(Generic[T]):
+    """
+    Write-behind очередь: элементы копятся в памяти (_push), а одна фоновая задача сбрасывает их
+    пачками через write_batch(batch) — каждые batch_size элементов или раз в flush_interval сек.
+
+    write_batch возвращает число записанного или None при ошибке (исключение — тоже ошибка):
+    неудачная пачка возвращается в начало очереди до следующей попытки.
+    После успешной записи вызывается _on_flushed(batch) — подклассы передают пачку дальше.
+    Использовать как async-контекст: при выходе (в т.ч. по исключению) очередь гарантированно сбрасывается.
+    """
+
+    def __init__(self, write_batch: Callable[[List[T]], Awaitable[Optional[int]]], target: str,
+                 batch_size: int = 200, flush_interval: float = 5.0):
+        self.write_batch = write_batch
+        self.target = target  # куда пишем — для сообщений об ошибках
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._pending: List[T] = []
+        self._lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+        self.flushed_total = 0
+        self.failed_flushes = 0
+
+    async def __aenter__(self):
+        self._task = asyncio.create_task(self._flush_loop())
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        # не cancel(): иначе можно оборвать пачку посреди записи
+        self._closing = True
+        self._wakeup.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        await self.flush()
+        if self._pending:
+            preview = [self._describe(item) for item in self._pending[:10]]
+            print(f"[ОШИБКА ЗАПИСИ] 🔴 Не записано в {self.target}: {len(self._pending)} шт. → {preview}…")
+
+    @property
+    def unflushed(self) -> int:
+        """
+        Сколько элементов ещё не записано. После выхода из контекста — то, что не удалось записать совсем.
+        """
+        return len(self._pending)
+
+    def _push(self, item: T):
+        self._pending.append(item)
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    def _describe(self, item: T) -> Any:
+        """
+        Как показать элемент в сообщении о незаписанном остатке.
+        """
+        return item
+
+    async def _on_flushed(self, batch: List[T]):
+        pass
+
+    async def flush(self) -> int:
+        """
+        Сбрасывает накопленное. При ошибке элементы остаются в очереди до следующей попытки.
+        """
+        async with self._lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, []
+
+            try:
+                written = await self.write_batch(batch)
+            except Exception as e:
+                print(f"[ОШИБКА ЗАПИСИ] {self.target}: {e}")
+                written = None
+            if written is None:
+                self.failed_flushes += 1
+                self._pending = batch + self._pending
+                print(f"[ОШИБКА ЗАПИСИ] 🔴 {self.target}: пачка из {len(batch)} шт. не записана, повторим позже")
+                return 0
+
+            self.flushed_total += len(batch)
+            await self._on_flushed(batch)
+            return written
+
+    async def _flush_loop(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()